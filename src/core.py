@@ -1,46 +1,87 @@
+import functools
 import json
+import mmap
 import os
+import re
 import shutil
 import string
 import struct
 import sys
 import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from src import ui
 from src.ray import Ray
-from src.util import graceful_exit, wait_for
+from src.util import DeviceWatch, graceful_exit, wait_for
 
 
 #
 # Firmware flashing functions
 #
+def find_connected_devices():
+    """Return ``(board_ports, bootloader_drives)`` for every connected device.
+
+    Serial-port enumeration and the bootloader drive scan are independent and
+    both spend their time waiting on the OS, so the port scan runs on a worker
+    thread while the drive scan runs here.
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        ports = executor.submit(Ray.find_board_ports)
+        drives = list_rpi_rp2_drives()
+        return ports.result(), drives
+
+
+def count_connected_devices():
+    """Return how many devices are connected, running or in bootloader mode."""
+    ports, drives = find_connected_devices()
+    return len(ports) + len(drives)
+
+
+def _reset_into_bootloader(port):
+    with Ray(port) as board:
+        board.enter_bootloader_mode()
+
+
 def get_all_boards_into_bootloader():
-    # get all bootloader drives
-    bootloader_drives = list_rpi_rp2_drives()
+    # get all connected devices, running and already in bootloader mode
+    ports, bootloader_drives = find_connected_devices()
     initial_drives = len(bootloader_drives)
     ui.step(f"{len(bootloader_drives)} device(s) already in bootloader mode")
 
-    # Find all connected devices
-    ports = Ray.find_board_ports()
     initial_ports = len(ports)
     ui.step(f"{len(ports)} device(s) running, need a reset into bootloader mode")
     for port in ports:
-        # Put the board in bootloader mode
         ui.detail(f"resetting {port} into bootloader mode...")
-        Ray(port).enter_bootloader_mode()
+    # Put the boards in bootloader mode. Each one spends its time opening the
+    # port and entering the raw REPL, so they are reset side by side.
+    with ThreadPoolExecutor(max_workers=max(1, len(ports))) as executor:
+        list(executor.map(_reset_into_bootloader, ports))
 
     expected_drive_count = initial_drives + initial_ports
 
     # Wait for bootloader drives to appear
     def wait_for_bootloader():
         drives = list_rpi_rp2_drives()
-        print(ui.status(f"waiting for ({len(drives)} of {expected_drive_count}) device(s) to appear in bootloader mode"), end="")
-        return len(drives) >= expected_drive_count
+        return len(drives) >= expected_drive_count, ui.status(f"waiting for ({len(drives)} of {expected_drive_count}) device(s) to appear in bootloader mode")
 
     wait_for(wait_for_bootloader, timeout=60)
 
 
+def settle_drives(quiet=1.0, timeout=5.0):
+    """Give freshly mounted bootloader drives a moment to settle.
+
+    Returns once no USB device or mount has changed for ``quiet`` seconds,
+    or after ``timeout`` at most. Without device events (see ``DeviceWatch``)
+    every wait counts as a change, so this is the full ``timeout``.
+    """
+    deadline = time.monotonic() + timeout
+    with DeviceWatch() as watch:
+        while (remaining := deadline - time.monotonic()) > 0:
+            if not watch.wait(min(quiet, remaining)):
+                return
+
+
 def flash_firmware(firmware_path):
     """Core function to flash firmware to devices"""
     ui.heading("Flashing firmware")
@@ -56,31 +97,21 @@ def flash_firmware(firmware_path):
         graceful_exit()
     nuke_path = nuke_path[0]
 
-    # give the drives a moment to settle
-    time.sleep(5)
+    settle_drives()
 
-    for drive in bootloader_drives:
-        ui.step(f"wiping {drive} with {os.path.basename(nuke_path)}")
-        shutil.copy(nuke_path, drive)
-        try:
-            os.sync()
-        except Exception:
-            # only available on some platforms
-            pass
+    copy_uf2_to_all(nuke_path, bootloader_drives)
 
     # Wait for the drives to start executing uf2s
     def wait_for_flash():
         drives = list_rpi_rp2_drives()
-        print(ui.status(f"waiting for ({len(bootloader_drives) - len(drives)} of {len(bootloader_drives)}) device(s) to begin flashing"), end="")
-        return len(drives) < len(bootloader_drives)
+        return len(drives) < len(bootloader_drives), ui.status(f"waiting for ({len(bootloader_drives) - len(drives)} of {len(bootloader_drives)}) device(s) to begin flashing")
 
     wait_for(wait_for_flash, timeout=60)
 
     # Wait for the drives to reappear after nuking
     def wait_for_reappear():
         drives = list_rpi_rp2_drives()
-        print(ui.status(f"waiting for ({len(drives)} of {len(bootloader_drives)}) device(s) to re-enter bootloader mode"), end="")
-        return len(drives) >= len(bootloader_drives)
+        return len(drives) >= len(bootloader_drives), ui.status(f"waiting for ({len(drives)} of {len(bootloader_drives)}) device(s) to re-enter bootloader mode")
 
     wait_for(wait_for_reappear, timeout=60)
 
@@ -89,23 +120,14 @@ def flash_firmware(firmware_path):
     if len(bootloader_drives) == len(list_rpi_rp2_drives()):
         bootloader_drives = list_rpi_rp2_drives()
 
-    # give the drives a moment to settle
-    time.sleep(5)
+    settle_drives()
 
-    for drive in bootloader_drives:
-        ui.step(f"flashing {os.path.basename(firmware_path)} to {drive}")
-        shutil.copy(firmware_path, drive)
-        try:
-            os.sync()
-        except Exception:
-            # only available on some platforms
-            pass
+    copy_uf2_to_all(firmware_path, bootloader_drives)
 
     # Wait for the drives to reappear as Ray devices
     def wait_for_rpi_rp2():
         boards = Ray.find_board_ports()
-        print(ui.status(f"waiting for ({len(boards)} of {len(bootloader_drives)}) board(s) to restart"), end="")
-        return len(boards) >= len(bootloader_drives)
+        return len(boards) >= len(bootloader_drives), ui.status(f"waiting for ({len(boards)} of {len(bootloader_drives)}) board(s) to restart")
 
     try:
         wait_for(wait_for_rpi_rp2, timeout=60)
@@ -122,9 +144,75 @@ def flash_firmware(firmware_path):
         ui.success("Firmware flashed.")
 
 
+def _copy_file_windows(src, dst):
+    """Copy ``src`` to ``dst`` with the Win32 ``CopyFileExW`` API.
+
+    The copy runs entirely inside the OS rather than through Python's
+    read/write loop. Raises ``OSError`` if the copy fails.
+    """
+    import ctypes
+
+    if not ctypes.windll.kernel32.CopyFileExW(src, dst, None, None, None, 0):
+        raise ctypes.WinError()
+
+
+def _copy_file_mmap(src, dst):
+    """Copy ``src`` to ``dst`` by handing a read-only memory map of the source
+    to a single ``write()``, so the image is never read into a Python buffer.
+
+    The copy is flushed to the drive with ``fsync`` on just this file, rather
+    than a system-wide ``sync`` that would also wait on every other disk (and
+    on the other drives being flashed alongside it).
+    """
+    with open(src, "rb") as f_src, open(dst, "wb") as f_dst:
+        if os.fstat(f_src.fileno()).st_size == 0:
+            return  # an empty file cannot be mapped
+        with mmap.mmap(f_src.fileno(), 0, access=mmap.ACCESS_READ) as image:
+            f_dst.write(image)
+        f_dst.flush()
+        try:
+            os.fsync(f_dst.fileno())
+        except OSError:
+            # The board can reboot, taking its drive with it, as soon as the
+            # last block lands.
+            pass
+
+
+def copy_uf2_to_bootloader(uf2_path, drive):
+    """Copy a UF2 image onto a bootloader drive, which starts flashing it."""
+    dst = os.path.join(drive, os.path.basename(uf2_path))
+    if os.name == "nt":
+        try:
+            _copy_file_windows(uf2_path, dst)
+        except (OSError, AttributeError):
+            # Native copy unavailable or refused; fall back to the portable path.
+            _copy_file_mmap(uf2_path, dst)
+    else:
+        _copy_file_mmap(uf2_path, dst)
+
+
+def copy_uf2_to_all(uf2_path, drives):
+    """Copy a UF2 image onto every bootloader drive at once.
+
+    Each copy mostly waits on its own USB mass-storage device, so the drives
+    are written concurrently rather than one after another.
+    """
+    for drive in drives:
+        ui.step(f"copying {os.path.basename(uf2_path)} to {drive}")
+    with ThreadPoolExecutor(max_workers=max(1, len(drives))) as executor:
+        # list() re-raises the first failed copy here
+        list(executor.map(lambda drive: copy_uf2_to_bootloader(uf2_path, drive), drives))
+
+
 def list_bundled_uf2():
     """List available bundled UF2 files"""
+    return list(_bundled_uf2())
 
+
+@functools.cache
+def _bundled_uf2():
+    # The bundled images cannot change while we run, so the directory is
+    # only searched and listed once.
     candidates = []
     if hasattr(sys, "_MEIPASS"):
         # PyInstaller bundle (--add-data "uf2:uf2")
@@ -137,8 +225,9 @@ def list_bundled_uf2():
 
     for uf2_dir in candidates:
         if os.path.isdir(uf2_dir):
-            return [os.path.join(uf2_dir, f) for f in os.listdir(uf2_dir) if f.lower().endswith(".uf2")]
-    return []
+            with os.scandir(uf2_dir) as entries:
+                return tuple(entry.path for entry in entries if entry.name.lower().endswith(".uf2") and entry.is_file())
+    return ()
 
 
 # UF2 family IDs, used to tell which processor a firmware image targets.
@@ -165,16 +254,18 @@ def uf2_target_processor(uf2_path):
     families = set()
     try:
         with open(uf2_path, "rb") as f:
-            while True:
-                block = f.read(512)
-                if len(block) < 512:
-                    break
-                if block[0:4] != _UF2_MAGIC_START0:
-                    continue
-                flags = struct.unpack("<I", block[8:12])[0]
-                if flags & _UF2_FLAG_FAMILY_ID_PRESENT:
-                    families.add(struct.unpack("<I", block[28:32])[0])
-    except OSError:
+            size = os.fstat(f.fileno()).st_size
+            if size >= 512:
+                # Read the headers straight out of a memory map instead of
+                # copying every 512-byte block into a new bytes object.
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as image:
+                    for offset in range(0, size - 511, 512):
+                        if image[offset : offset + 4] != _UF2_MAGIC_START0:
+                            continue
+                        (flags,) = struct.unpack_from("<I", image, offset + 8)
+                        if flags & _UF2_FLAG_FAMILY_ID_PRESENT:
+                            families.add(struct.unpack_from("<I", image, offset + 28)[0])
+    except (OSError, ValueError):
         return None
 
     has_rp2040 = _UF2_FAMILY_RP2040 in families
@@ -303,25 +394,112 @@ def list_rpi_rp2_drives():
     """List all RPI-RP2 drives on Windows, Linux, or macOS"""
     found_drives = []
     if os.name == "nt":
-        # Check for Windows
-        for drive in string.ascii_uppercase:
-            info_path = f"{drive}:\\INFO_UF2.TXT"
-            if os.path.exists(info_path):
-                found_drives.append(f"{drive}:\\")
+        # Check for Windows. An empty card-reader slot or a slow hub can hold
+        # up each check, so the drives are checked side by side.
+        roots = [f"{drive}:\\" for drive in _windows_removable_drives()]
+        with ThreadPoolExecutor(max_workers=max(1, len(roots))) as executor:
+            present = list(executor.map(lambda root: os.path.exists(root + "INFO_UF2.TXT"), roots))
+        found_drives = [root for root, is_drive in zip(roots, present) if is_drive]
     else:
-        # Check for macOS and Linux
-        for drive_dir in ["/Volumes", "/media"]:
-            if not os.path.isdir(drive_dir):
-                continue
-            for root, dirs, files in os.walk(drive_dir):
-                if "INFO_UF2.TXT" in files:
-                    found_drives.append(root)
+        # Linux lists every mounted FAT filesystem in one file, wherever it is
+        # mounted; otherwise check where macOS and desktop Linux mount drives.
+        mount_points = _fat_mount_points() if sys.platform.startswith("linux") else None
+        if mount_points is not None:
+            found_drives = [path for path in mount_points if os.path.isfile(os.path.join(path, "INFO_UF2.TXT"))]
+        else:
+            for drive_dir in ["/Volumes", "/media", "/run/media"]:
+                found_drives.extend(_find_uf2_mounts(drive_dir))
     return found_drives
 
 
+PROC_MOUNTS = "/proc/self/mounts"
+# A bootloader drive is FAT12, which Linux mounts as vfat (or plain msdos).
+_FAT_FILESYSTEMS = {"vfat", "msdos"}
+
+
+def _fat_mount_points(mounts=PROC_MOUNTS):
+    """Mount points of FAT filesystems in a Linux mount table, in table order,
+    or None if the table cannot be read."""
+    try:
+        with open(mounts) as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    points = []
+    for line in lines:
+        fields = line.split()
+        if len(fields) >= 3 and fields[2] in _FAT_FILESYSTEMS:
+            # Spaces, tabs, newlines and backslashes in the path are escaped
+            # as three octal digits (e.g. "\040").
+            points.append(re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), fields[1]))
+    return points
+
+
+_DRIVE_REMOVABLE = 2
+
+
+def _windows_removable_drives():
+    """Letters of the removable drives that are present, which is all a
+    bootloader drive can be. Checking only these skips the stat of every
+    other letter, which on a network or optical drive can stall for a long
+    time. Falls back to every letter if the drive APIs are unavailable."""
+    try:
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        present = kernel32.GetLogicalDrives()
+    except (OSError, AttributeError):
+        return list(string.ascii_uppercase)
+    return [letter for i, letter in enumerate(string.ascii_uppercase) if present & (1 << i) and kernel32.GetDriveTypeW(f"{letter}:\\") == _DRIVE_REMOVABLE]
+
+
+def _find_uf2_mounts(drive_dir, depth=2):
+    """Find bootloader drives mounted under ``drive_dir``.
+
+    A bootloader drive is mounted directly in ``/Volumes`` on macOS and one
+    level down (``/media/<user>/RPI-RP2``, or ``/run/media/<user>/RPI-RP2``
+    on Fedora and Arch) on Linux, so only that deep is checked rather than
+    walking every file on every mounted volume.
+    """
+    found = []
+    try:
+        entries = sorted(os.scandir(drive_dir), key=lambda entry: entry.name)
+    except OSError:
+        return found
+    for entry in entries:
+        try:
+            if not entry.is_dir():
+                continue
+        except OSError:
+            continue
+        if os.path.isfile(os.path.join(entry.path, "INFO_UF2.TXT")):
+            found.append(entry.path)
+        elif depth > 1:
+            found.extend(_find_uf2_mounts(entry.path, depth - 1))
+    return found
+
+
 #
 # Software flashing functions
 #
+def _flash_board_software(board, update_files, index, total, progress):
+    """Upload ``update_files`` to one board. Returns False if it never became ready."""
+    ui.step(f"flashing {board.port} ({index + 1} of {total})")
+    # A board that was just firmware-flashed re-enumerates its serial
+    # port seconds before its application finishes booting. Wait for the
+    # REPL to actually respond before uploading, otherwise the first
+    # command (the SHA256 index) fires into a still-booting board and
+    # hangs with no output.
+    if not board.wait_until_ready(on_wait=lambda: ui.detail(f"{board.port}: waiting for the board to finish booting (this can take up to a minute)...")):
+        ui.error(f"{board.port}: board never became ready for software flashing.", indent=2)
+        ui.detail("Try unplugging and replugging this board, then run the program again.", indent=3)
+        return False
+    # Copy files to the board
+    board.write_update_to_board(update_files, progress=progress)
+    ui.success(f"{board.port}: software flashed.", indent=2)
+    return True
+
+
 def flash_software(software):
     ui.heading("Flashing software")
 
@@ -345,20 +523,20 @@ def flash_software(software):
         ui.step(f"found {len(ports)} device(s) to flash software to")
         boards = [Ray(port) for port in ports]
         update_files = get_files_from_update_file(software)
-        for i, board in enumerate(boards):
-            ui.step(f"flashing {board.port} ({i + 1} of {len(ports)})")
-            # A board that was just firmware-flashed re-enumerates its serial
-            # port seconds before its application finishes booting. Wait for the
-            # REPL to actually respond before uploading, otherwise the first
-            # command (the SHA256 index) fires into a still-booting board and
-            # hangs with no output.
-            if not board.wait_until_ready(on_wait=lambda b=board: ui.detail(f"{b.port}: waiting for the board to finish booting (this can take up to a minute)...")):
-                ui.error(f"{board.port}: board never became ready for software flashing.", indent=2)
-                ui.detail("Try unplugging and replugging this board, then run the program again.", indent=3)
-                graceful_exit()
-            # Copy files to the board
-            board.write_update_to_board(update_files)
-            ui.success(f"{board.port}: software flashed.", indent=2)
+        # Decode and hash every file once, up front: the boards below share
+        # these dicts, and filling the caches from several threads at once
+        # would race and repeat the work per board.
+        for file_info in update_files:
+            Ray.file_sha256(file_info)
+        # Each board is mostly waiting on its own serial port, so flash them
+        # all at once: the whole batch takes about as long as one board. The
+        # per-file progress line only makes sense for a single board.
+        progress = len(boards) == 1
+        with ThreadPoolExecutor(max_workers=max(1, len(boards))) as executor:
+            futures = [executor.submit(_flash_board_software, board, update_files, i, len(boards), progress) for i, board in enumerate(boards)]
+            flashed = [future.result() for future in futures]
+        if not all(flashed):
+            graceful_exit()
 
         # restart the boards
         for board in boards:
@@ -367,8 +545,7 @@ def flash_software(software):
         # wait for the boards to reboot
         def wait_for_reboot():
             restarted_boards = Ray.find_board_ports()
-            print(ui.status(f"waiting for ({len(restarted_boards)} of {len(ports)}) board(s) to restart"), end="")
-            return len(ports) <= len(restarted_boards)
+            return len(ports) <= len(restarted_boards), ui.status(f"waiting for ({len(restarted_boards)} of {len(ports)}) board(s) to restart")
 
         wait_for(wait_for_reboot, timeout=60)
         ui.success("Software flashing complete.")
@@ -383,18 +560,23 @@ def get_files_from_update_file(update_file):
     files = []
     with open(update_file, "r") as f:
         f.readline()  # Skip the first line (metadata)
-        for line in f.readlines():
-            line = line.strip()
-            if line == "":
+        # Iterate the file rather than readlines(), and cut each part out of
+        # the line by index: the contents are most of the update, so every
+        # intermediate copy of a line (strip, split, split) adds up.
+        for line in f:
+            start = line.find("{")
+            if start == -1:
+                if line.strip():
+                    raise ValueError(f"Malformed update file line: {line[:80]!r}")
                 continue
-            filename, metadata_and_contents = line.split("{", 1)
-            metadata, contents = metadata_and_contents.split("}", 1)
+            end = line.find("}", start)
+            filename = line[:start].strip()
 
             if filename == "":
                 # This is probably the last line in the file, which is the signature
                 continue
 
-            files.append({"filename": filename, "metadata": json.loads("{" + metadata + "}"), "base64_contents": contents.strip()})
+            files.append({"filename": Ray.board_path(filename), "metadata": json.loads(line[start : end + 1]), "base64_contents": line[end + 1 :].strip()})
 
     return files
 
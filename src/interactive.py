@@ -7,9 +7,7 @@ import time
 from binascii import a2b_base64, unhexlify
 from datetime import datetime
 
-import requests
 import rsa
-from InquirerPy import inquirer
 
 from src import ui
 from src.core import (
@@ -26,6 +24,10 @@ from src.core import (
 from src.ray import Ray
 from src.util import graceful_exit
 
+# The prompt (InquirerPy / prompt_toolkit) and HTTP (requests) libraries are
+# imported inside the functions that use them, so the welcome banner shows
+# without waiting for them to load.
+
 # Matches a "**Label**: `version`" line in a release body's "## Versions" block.
 _RELEASE_VERSION_RE = re.compile(r"\*\*([^*]+)\*\*:\s*`([^`]+)`")
 
@@ -50,22 +52,27 @@ def select_firmware_and_system():
 
     Returns ``(firmware_path, system_id)``.
     """
+    from InquirerPy import inquirer
+    from InquirerPy.base.control import Choice
+
     bundled = [f for f in list_bundled_uf2() if "nuke.uf2" not in f]
 
-    # Build a menu entry for each known series, resolving its OS firmware.
-    entries = []  # list of (display_text, system_id, firmware_path_or_None)
+    # One menu entry per known series. Each choice carries its resolved
+    # (system_id, firmware_path_or_None) as its value, so the selection needs
+    # no lookup back from the display text.
+    choices = []
     for system in SERIES_MENU_ORDER:
         label = SYSTEM_LABEL.get(system, system)
         firmware = find_system_firmware(system, bundled)
-        display = label if firmware else f"{label} (coming soon)"
-        entries.append((display, system, firmware))
+        choices.append(Choice(value=(system, firmware), name=label if firmware else f"{label} (coming soon)"))
+    choices += [Choice(value="custom", name="Custom firmware..."), Choice(value=None, name="Exit")]
 
-    choices = [e[0] for e in entries] + ["Custom firmware...", "Exit"]
-    menu_entry = inquirer.select(message="Select the game series to flash:", choices=choices, default=0).execute()
+    # Defaults match on a choice's value, so start on the first series.
+    selection = inquirer.select(message="Select the game series to flash:", choices=choices, default=choices[0].value).execute()
 
-    if menu_entry == "Exit":
+    if selection is None:
         graceful_exit(now=True)
-    if menu_entry == "Custom firmware...":
+    if selection == "custom":
         path = inquirer.text("Enter the full path to a custom UF2 file:").execute()
         print(f"You entered: {path}")
         if not os.path.isfile(path):
@@ -73,7 +80,7 @@ def select_firmware_and_system():
             graceful_exit()
         return path, firmware_system(path)
 
-    display, system, firmware = next(e for e in entries if e[0] == menu_entry)
+    system, firmware = selection
     if firmware is None:
         # Series chosen whose OS is not released yet -- explain and re-prompt.
         label = SYSTEM_LABEL.get(system, system)
@@ -134,6 +141,8 @@ def report_and_guard_boards(firmware):
     for the boards that were successfully identified. Boards already in
     bootloader mode cannot be queried over the REPL and are skipped.
     """
+    from InquirerPy import inquirer
+
     firmware_processor = uf2_target_processor(firmware) if firmware else None
 
     ports = Ray.find_board_ports()
@@ -187,42 +196,45 @@ def prompt_next_action():
       - ``"reconfigure"``: pick a different game series / software, then flash
       - ``"quit"``:        exit the program
     """
-    same = "Flash more boards with the same settings"
-    change = "Change settings (game series / software), then flash"
-    quit_ = "Quit"
-    choice = inquirer.select(
+    from InquirerPy import inquirer
+    from InquirerPy.base.control import Choice
+
+    return inquirer.select(
         message="Flashing complete. What would you like to do next?",
-        choices=[same, change, quit_],
-        default=same,
+        choices=[
+            Choice(value="again", name="Flash more boards with the same settings"),
+            Choice(value="reconfigure", name="Change settings (game series / software), then flash"),
+            Choice(value="quit", name="Quit"),
+        ],
+        default="again",
     ).execute()
-    if choice == change:
-        return "reconfigure"
-    if choice == quit_:
-        return "quit"
-    return "again"
 
 
 def select_devices() -> list[Ray]:
+    from InquirerPy import inquirer
+    from InquirerPy.base.control import Choice
+
     ports = Ray.find_board_ports()
 
     if not ports:
         print("No Warped Pinball devices found. Please plug in via USB and try again. Do not press the 'BOOTSEL' button when plugging in.")
         graceful_exit()
 
-    ports.append("Exit")
+    # The Exit entry carries None as its value so it can never collide with a
+    # port name.
+    choices = [Choice(value=port, name=port) for port in ports] + [Choice(value=None, name="Exit")]
 
     selected_ports = []
     while not selected_ports:
-        if len(ports) < 2:
-            single_choice = inquirer.select(message="Confirm the device to flash:", choices=ports).execute()
-            selected_ports = [single_choice]
+        if len(choices) < 2:
+            selected_ports = [inquirer.select(message="Confirm the device to flash:", choices=choices).execute()]
         else:
             print("\nUse SPACE to select multiple devices, then press ENTER to confirm.")
-            selected_ports = inquirer.checkbox(message="Confirm the devices to flash:", choices=ports).execute()
+            selected_ports = inquirer.checkbox(message="Confirm the devices to flash:", choices=choices).execute()
 
         if not selected_ports:
             print("No devices selected. Please select at least one device.")
-        elif "Exit" in selected_ports:
+        elif None in selected_ports:
             graceful_exit(now=True)
 
     return selected_ports
@@ -238,8 +250,11 @@ def _parse_release_versions(body):
 
 
 def select_software(system=DEFAULT_SYSTEM):
-    # TODO allow for custom update.json files
+    import requests
+    from InquirerPy import inquirer
+    from InquirerPy.base.control import Choice
 
+    # TODO allow for custom update.json files
     # Each Vector system publishes its own software update asset in the same
     # release (e.g. update_wpc.json), and the release body reports both the
     # overall Vector version and this system's own version.
@@ -296,10 +311,9 @@ def select_software(system=DEFAULT_SYSTEM):
     filtered_releases.sort(key=lambda r: parse_version(r["tag_name"]), reverse=True)
 
     # Format dates and prepare choices. Show both the series-specific version
-    # and the overall Vector version, plus the series the build is from.
+    # and the overall Vector version, plus the series the build is from. Each
+    # choice carries its release as the value, so no reverse lookup is needed.
     choices = []
-    release_map = {}  # Map formatted choice to original release
-
     for i, release in enumerate(filtered_releases):
         versions = _parse_release_versions(release.get("body"))
         vector_version = versions.get("Vector", release["tag_name"].lstrip("v"))
@@ -315,19 +329,15 @@ def select_software(system=DEFAULT_SYSTEM):
             choice_text = f"{series_label}  (Vector {vector_version}, {formatted_date})"
         if i == 0:
             choice_text += "  (Recommended)"
-        choices.append(choice_text)
-        release_map[choice_text] = release
+        choices.append(Choice(value=release, name=choice_text))
 
-    choices.append("Exit")
+    choices.append(Choice(value=None, name="Exit"))
 
-    selected_choice = inquirer.select(message="Select a software release:", choices=choices).execute()
+    selected_release = inquirer.select(message="Select a software release:", choices=choices).execute()
 
-    if selected_choice == "Exit":
+    if selected_release is None:
         graceful_exit(now=True)
 
-    # Get the selected release data
-    selected_release = release_map[selected_choice]
-
     # Find the update asset for this system and its download URL
     try:
         update_json_asset = next(asset for asset in selected_release["assets"] if asset["name"] == update_filename)
@@ -6,24 +6,10 @@ import time
 import traceback
 
 from src import __version__, ui
-from src.core import (
-    firmware_system,
-    flash_firmware,
-    flash_software,
-    list_rpi_rp2_drives,
-    system_for_boards,
-)
-from src.interactive import (
-    display_welcome,
-    prompt_next_action,
-    report_and_guard_boards,
-    select_firmware_and_system,
-    select_software,
-)
-from src.ray import Ray
-from src.util import graceful_exit, wait_for
-
-atexit.register(Ray.close_all)
+
+# The serial, network and prompt libraries are imported inside the functions
+# that use them, so ``--version`` / ``--help`` and argument errors exit from
+# argparse without loading any of them.
 
 
 def parse_arguments():
@@ -50,13 +36,20 @@ def parse_arguments():
 
 # Set up signal handler for Ctrl+C
 def signal_handler(sig, frame):
+    from src.ray import Ray
+
     # Avoid print statements in signal handlers
     Ray.close_all()
     # Use sys.exit to terminate immediately
     sys.exit(0)
 
 
-signal.signal(signal.SIGINT, signal_handler)
+def install_exit_handlers():
+    """Close every open serial connection on exit or Ctrl+C."""
+    from src.ray import Ray
+
+    atexit.register(Ray.close_all)
+    signal.signal(signal.SIGINT, signal_handler)
 
 
 def wait_for_one_or_more_devices():
@@ -68,7 +61,10 @@ def wait_for_one_or_more_devices():
     connected before we started listening can occasionally fail to enumerate
     for us, and a replug reliably clears that.
     """
-    already_connected = len(Ray.find_board_ports() + list_rpi_rp2_drives())
+    from src.core import count_connected_devices
+    from src.util import wait_for
+
+    already_connected = count_connected_devices()
     if already_connected:
         return already_connected
 
@@ -78,33 +74,37 @@ def wait_for_one_or_more_devices():
 
     def firmware_listen_func():
         nonlocal hint_shown
+        status = "Listening for devices (press ctrl + c to exit)"
         if not hint_shown and (time.monotonic() - start_time) > 10:
-            print("\rStill waiting... If your board is already plugged in, unplug it and plug it back in.")
+            status = "Still waiting... If your board is already plugged in, unplug it and plug it back in.\n" + status
             hint_shown = True
-        print("Listening for devices (press ctrl + c to exit)", end="")
-        return len(Ray.find_board_ports() + list_rpi_rp2_drives())
+        return count_connected_devices(), status
 
     wait_for(firmware_listen_func, timeout=None)
-    return len(Ray.find_board_ports() + list_rpi_rp2_drives())
+    return count_connected_devices()
 
 
 def wait_for_zero_devices():
+    from src.core import count_connected_devices
+    from src.util import wait_for
+
     # wait until all devices disconnect
     def disconnect_listen_func():
-        print("Flash complete, disconnect all boards before flashing more", end="")
-        return len(Ray.find_board_ports() + list_rpi_rp2_drives()) == 0
+        return count_connected_devices() == 0, "Flash complete, disconnect all boards before flashing more"
 
     wait_for(disconnect_listen_func, timeout=None)
 
 
 def wait_for_n_devices(n):
+    from src.core import count_connected_devices
+    from src.util import wait_for
+
     # wait until n devices are connected
     def firmware_listen_func():
-        print(f"Waiting for {n} devices (press ctrl + c to exit)", end="")
-        return len(Ray.find_board_ports() + list_rpi_rp2_drives()) == n
+        return count_connected_devices() == n, f"Waiting for {n} devices (press ctrl + c to exit)"
 
     wait_for(firmware_listen_func, timeout=None)
-    return len(Ray.find_board_ports() + list_rpi_rp2_drives())
+    return count_connected_devices()
 
 
 def choose_firmware_and_software(args):
@@ -119,6 +119,9 @@ def choose_firmware_and_software(args):
       - series selected: pick the asset for that system up front
       - --skip-firmware: defer until we can read the system from the board
     """
+    from src.core import firmware_system
+    from src.interactive import select_firmware_and_system, select_software
+
     firmware = None
     system = None
     if not args.skip_firmware:
@@ -137,6 +140,18 @@ def choose_firmware_and_software(args):
 
 def main():
     args = parse_arguments()
+
+    from src.core import flash_firmware, flash_software, system_for_boards
+    from src.interactive import (
+        display_welcome,
+        prompt_next_action,
+        report_and_guard_boards,
+        select_software,
+    )
+    from src.ray import Ray
+    from src.util import graceful_exit
+
+    install_exit_handlers()
     display_welcome()
 
     firmware, system, software = choose_firmware_and_software(args)
@@ -186,18 +201,19 @@ def main():
         while not (ports := Ray.find_board_ports()):
             time.sleep(0.01)
         port = ports[0]
-        board = Ray(port)
         print("Listening for device output (press ctrl + c to exit)")
         print("")
         print("")
-        board.listen()
-        board.close()
+        with Ray(port) as board:
+            board.listen()
 
 
 if __name__ == "__main__":
     try:
         main()
     except Exception as e:
+        from src.util import graceful_exit
+
         ui.error(f"{e}", indent=0)
         traceback.print_exc()
         ui.warning("Program did not exit gracefully. Do not install boards in a pinball machine without successfully flashing.", indent=0)
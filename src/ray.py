@@ -1,21 +1,137 @@
-import base64
+import binascii
+import codecs
 import hashlib
 import json
 import os
+import sys
 import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 
 import serial
-import serial.tools.list_ports
 
 from src import ui
 
 PICO_VID = 0x2E8A
 PICO_PID = 0x0005  # MicroPython CDC (typical, but we match on VID alone)
+# The boards' serial ports are USB CDC, which ignores the line rate: data moves
+# at USB full speed whatever is set here, so this only has to be a rate every
+# host driver accepts.
+BAUD_RATE = 115200
+# Upper bound on one command's source, in characters. The board compiles each
+# command whole, so this keeps that within its RAM; file data never counts
+# towards it, as it follows its receive() command as raw bytes.
 COMMAND_CHUNK_SIZE = 5000
+SYSFS_TTY = "/sys/class/tty"
+# How long a comports() scan is reused. It can walk WMI / IOKit on every call,
+# and the wait loops ask for the ports several times a second.
+PORT_SCAN_TTL = 0.5
+RAW_REPL_BANNER = b"raw REPL; CTRL-B to exit\r\n>"
+# A single write still unfinished after this long means the board stopped
+# reading (crashed or unplugged); fail instead of blocking forever. Long enough
+# for the largest file to go out in one write at flash speed.
+WRITE_TIMEOUT = 30
+SERIAL_BUFFER_SIZE = 256 * 1024
+# Printed by the board's receive() once it is ready to read a file's raw bytes.
+READY_MARKER = b"<<<ready>>>"
+# Printed by sha256_index's board script after the last file's line.
+SHA256_INDEX_END = "<<<end>>>"
+# How much of a file the board reads per call, both when receive() writes it
+# from stdin and when it is hashed; one littlefs block, and a whole number of
+# 64-byte USB full-speed packets.
+RECEIVE_CHUNK_SIZE = 4096
+
+# The helpers every upload runs first. Constant, so it is built once at import
+# rather than on each generate_transfer_script() call.
+TRANSFER_SETUP_SCRIPT = "\n".join(
+    [
+        "import os",
+        "import sys",
+        "import binascii",
+        "import hashlib",
+        "import micropython",
+        "hash_checks = []",
+        # Ctrl-C handling is switched off before asking for the data (a
+        # 0x03 byte would otherwise raise KeyboardInterrupt); the REPL
+        # switches it back on when the command finishes. The marker is only
+        # printed once the file is open: if open() fails, the host never sees
+        # it and so never streams the file's bytes into the REPL as code.
+        # Once it has, every byte must be read even if writing fails (e.g. a
+        # full filesystem): any left on stdin would run as the next command.
+        "def receive(path, size):",
+        "    micropython.kbd_intr(-1)",
+        "    with open(path, 'wb') as f:",
+        f"        print({READY_MARKER.decode()!r})",
+        "        try:",
+        "            while size:",
+        f"                data = sys.stdin.buffer.read(min(size, {RECEIVE_CHUNK_SIZE}))",
+        "                size -= len(data)",
+        "                f.write(data)",
+        "        except Exception:",
+        "            while size:",
+        f"                size -= len(sys.stdin.buffer.read(min(size, {RECEIVE_CHUNK_SIZE})))",
+        "            raise",
+        "",
+        f"hash_buf = bytearray({RECEIVE_CHUNK_SIZE})",
+        "def hash_check(path, expected_hash):",
+        "    try:",
+        "        sha256 = hashlib.sha256()",
+        "        view = memoryview(hash_buf)",
+        "        with open(path, 'rb') as f:",
+        "            while True:",
+        "                n = f.readinto(hash_buf)",
+        "                if not n:",
+        "                    break",
+        "                sha256.update(view[:n])",
+        "        hash = binascii.hexlify(sha256.digest()).decode('utf-8')",
+        "    except Exception:",
+        "        hash = ''",
+        "    global hash_checks",
+        "    hash_checks.append((path, hash == expected_hash))",
+        "",
+        # Like os.makedirs(path, exist_ok=True): create each level in turn.
+        "def mdir(path):",
+        "    built = ''",
+        "    for part in path.split('/'):",
+        "        if not part:",
+        "            continue",
+        "        built += '/' + part",
+        "        try:",
+        "            os.mkdir(built)",
+        "        except OSError:",
+        "            pass",
+        "",
+        # Run the script in a fresh namespace rather than importing it, so no
+        # module is left behind in sys.modules (and its RAM) for a file that
+        # is deleted straight afterwards.
+        "def execute_file(path):",
+        "    try:",
+        "        with open(path) as fh:",
+        "            source = fh.read()",
+        "        scope = {'__name__': path, '__file__': path}",
+        "        exec(source, scope)",
+        "        del source",
+        "        if 'main' in scope:",
+        "            scope['main']()",
+        "    except Exception as e:",
+        "        print('Error message:', str(e))",
+        "        print('Error executing file:', path)",
+        "    try:",
+        "        os.remove(path)",
+        "    except OSError:",
+        "        pass",  # file probably removed itself
+    ]
+)
 
 
 class Ray:
-    _instances = set()
+    # Weak references, so an instance nobody holds any more can be collected
+    # (pyserial closes its port when that happens) instead of being kept
+    # alive here until close() is called.
+    _instances = weakref.WeakSet()
+    # Last comports() result and when it was taken (see PORT_SCAN_TTL).
+    _ports_cache = None
+    _ports_time = 0.0
 
     def __init__(self, port: str):
         # Track this instance
@@ -23,8 +139,10 @@ class Ray:
 
         self.port = port
 
-    def __del__(self):
-        # Clean up when the instance is garbage-collected
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
         self.close()
 
     def close(self):
@@ -35,8 +153,7 @@ class Ray:
             except Exception:
                 pass  # Already closed or error closing
         # Remove from tracked instances
-        if self in Ray._instances:
-            Ray._instances.remove(self)
+        Ray._instances.discard(self)
 
     @classmethod
     def close_all(cls):
@@ -56,9 +173,16 @@ class Ray:
             last_err = None
             for _ in range(5):
                 try:
-                    self.ser = serial.Serial(self.port, 115200, timeout=0.1)
+                    self.ser = serial.Serial(self.port, BAUD_RATE, timeout=0.1, write_timeout=WRITE_TIMEOUT)
+                    if hasattr(self.ser, "set_buffer_size"):
+                        # Windows only: the driver's default queues are small,
+                        # which splits an upload into many more writes.
+                        self.ser.set_buffer_size(rx_size=SERIAL_BUFFER_SIZE, tx_size=SERIAL_BUFFER_SIZE)
+                    # Drop whatever the board printed before we attached. A
+                    # new handle has nothing queued to send, so there is no
+                    # output to flush. This also stays inside the retry: on
+                    # Windows it is the flush that can fail on a fresh handle.
                     self.ser.flushInput()
-                    self.ser.flushOutput()
                     break
                 except (serial.SerialException, OSError) as e:
                     last_err = e
@@ -74,9 +198,46 @@ class Ray:
                 raise last_err
             if raw_repl:
                 self.ser.write(b"\x03\x03")  # Ctrl+C
-                time.sleep(0.1)  # Give time for the interrupt to process
                 self.ser.write(b"\x01")
-                time.sleep(0.1)  # Give time for the interrupt to process
+                # Continue as soon as the raw REPL banner arrives (a few ms on
+                # a healthy board) rather than after fixed sleeps. If the
+                # interrupted application takes longer, the Ctrl-A waits in
+                # the board's input buffer; give up waiting after as long as
+                # the sleeps used to take.
+                try:
+                    self._read_until(bytearray(), RAW_REPL_BANNER, time.time() + 0.2, "no raw REPL banner")
+                except TimeoutError:
+                    pass
+                self._raw_paste_window = self._probe_raw_paste()
+
+    def _probe_raw_paste(self, timeout: float = 0.5) -> int | None:
+        """Ask the raw REPL whether it supports raw-paste mode.
+
+        Returns the flow-control window size the board announced, or None if
+        the firmware answered ``R\\x00`` (unsupported) or predates raw-paste
+        and just re-printed its banner; commands then fall back to the classic
+        raw REPL. The probe opens a paste, so an empty one is sent to close it
+        again before returning.
+        """
+        self.ser.flushInput()  # drop the raw REPL banner
+        self.ser.write(b"\x05A\x01")
+        deadline = time.time() + timeout
+        buf = bytearray()
+        try:
+            while b"R\x01" not in buf and b"R\x00" not in buf:
+                self._read_more(buf, deadline, "no raw-paste answer")
+            start = buf.find(b"R\x01")
+            if start == -1:
+                return None
+            start += 2
+            while len(buf) < start + 2:
+                self._read_more(buf, deadline, "no raw-paste window size")
+            window = int.from_bytes(buf[start : start + 2], "little")
+            self.ser.write(b"\x04")
+            self._read_until(buf, b"\x04>", deadline, "empty raw-paste did not finish", start + 2)
+            return window
+        except TimeoutError:
+            return None
 
     @staticmethod
     def _port_is_board(port_info) -> bool:
@@ -97,7 +258,41 @@ class Ray:
 
     @classmethod
     def find_board_ports(cls) -> list[str]:
-        return [p.device for p in serial.tools.list_ports.comports() if cls._port_is_board(p)]
+        if sys.platform.startswith("linux") and os.path.isdir(SYSFS_TTY):
+            return cls._find_board_ports_sysfs()
+        # Only needed off Linux, so not loaded at startup there.
+        import serial.tools.list_ports
+
+        now = time.monotonic()
+        if cls._ports_cache is None or now - cls._ports_time >= PORT_SCAN_TTL:
+            cls._ports_cache = [p.device for p in serial.tools.list_ports.comports() if cls._port_is_board(p)]
+            cls._ports_time = now
+        return list(cls._ports_cache)
+
+    @staticmethod
+    def _find_board_ports_sysfs(root: str = SYSFS_TTY) -> list[str]:
+        """Linux fast path for ``find_board_ports``.
+
+        The boards enumerate as USB CDC ACM devices, so only ``ttyACM*``
+        entries need checking, and each needs just one read: the vendor ID of
+        the USB device that owns it. pyserial's ``comports()`` instead builds
+        full details for every tty in the system, and the wait loops call this
+        several times a second.
+        """
+        ports = []
+        for name in sorted(os.listdir(root)):
+            if not name.startswith("ttyACM"):
+                continue
+            try:
+                # device -> the USB interface; its parent is the USB device.
+                interface = os.path.realpath(os.path.join(root, name, "device"))
+                with open(os.path.join(os.path.dirname(interface), "idVendor")) as f:
+                    vid = int(f.read(), 16)
+            except (OSError, ValueError):
+                continue
+            if vid == PICO_VID:
+                ports.append("/dev/" + name)
+        return ports
 
     def send_command(self, script, ignore_response=False, read_timeout=None, wait_for_completion=False) -> str:
         """
@@ -121,6 +316,10 @@ class Ray:
         the USB CDC buffers fill up, MicroPython blocks writing to stdout, and
         the board deadlocks mid-script. Leave it False only for commands that
         never complete normally (e.g. machine.reset / machine.bootloader).
+
+        If ``open()`` found that the firmware supports raw-paste mode, the
+        script is streamed under the board's flow control (see
+        ``_write_raw_paste``) instead of being written in one go.
         """
         # Make sure the serial port is open
         self.open()
@@ -138,10 +337,19 @@ class Ray:
             # flush the input buffer
             self.ser.flushInput()
 
-        self.ser.write(script.encode("utf-8"))
-
-        # 3) Send Ctrl-D to indicate we're done and want to execute
-        self.ser.write(b"\x04")
+        # Fire-and-forget commands (reset / bootloader) stay on the classic
+        # raw REPL: raw-paste needs a handshake with a board that may be gone.
+        if getattr(self, "_raw_paste_window", None) and (wait_for_completion or not ignore_response):
+            # Raw-paste mode: the board acknowledges the end of the script
+            # with EOT (0x04) instead of "OK".
+            buf = self._write_raw_paste(script.encode("utf-8"), deadline)
+            accepted = b"\x04"
+        else:
+            self.ser.write(script.encode("utf-8"))
+            # 3) Send Ctrl-D to indicate we're done and want to execute
+            self.ser.write(b"\x04")
+            buf = bytearray()
+            accepted = b"OK"
 
         if ignore_response:
             if not wait_for_completion:
@@ -149,16 +357,8 @@ class Ray:
             # Drain the raw REPL response until the command finishes. Raw REPL
             # output ends with EOT (0x04) marking end of stdout, another EOT
             # marking end of stderr, then the ">" prompt.
-            tail = b""
-            while True:
-                if self.ser.in_waiting > 0:
-                    chunk = self.ser.read(self.ser.in_waiting)
-                    tail = (tail + chunk)[-3:]
-                    if tail.endswith(b"\x04>"):
-                        return
-                elif deadline is not None and time.time() > deadline:
-                    raise TimeoutError(f"Board on {self.port} did not finish command within {read_timeout}s")
-                time.sleep(0.01)
+            self._read_completion(buf, accepted, deadline, f"Board on {self.port} did not finish command within {read_timeout}s")
+            return
 
         # Read the raw-REPL response. After executing the command the board
         # emits:  OK <stdout> \x04 <stderr> \x04 >
@@ -175,36 +375,196 @@ class Ray:
         # coalesced case the old code consumed everything while looking for
         # "OK", then blocked forever in "wait until we have data" because the
         # buffer was already drained -- the 30s timeout the user hit.
-        buf = b""
-        while b"OK" not in buf:
-            if self.ser.in_waiting > 0:
-                buf += self.ser.read(self.ser.in_waiting)
-            elif deadline is not None and time.time() > deadline:
-                raise TimeoutError(f"No 'OK' response from board on {self.port} within {read_timeout}s")
-            else:
-                time.sleep(0.01)
-
-        # Drop everything up to and including the "OK" acknowledgement.
-        buf = buf[buf.index(b"OK") + 2 :]
+        name = "'OK'" if accepted == b"OK" else "raw-paste"
+        start = self._read_until(buf, accepted, deadline, f"No {name} response from board on {self.port} within {read_timeout}s")
 
         # Read until both the stdout and stderr EOT markers have arrived.
-        while buf.count(b"\x04") < 2:
-            if self.ser.in_waiting > 0:
-                buf += self.ser.read(self.ser.in_waiting)
-            elif deadline is not None and time.time() > deadline:
-                raise TimeoutError(f"No output from board on {self.port} within {read_timeout}s")
-            else:
-                time.sleep(0.01)
+        error = f"No output from board on {self.port} within {read_timeout}s"
+        end = self._read_until(buf, b"\x04", deadline, error, start)
+        self._read_until(buf, b"\x04", deadline, error, end)
 
         # Split out stdout and stderr (each terminated by an EOT marker) and
         # return them joined. Callers extract their payload with find()/rfind(),
         # and keeping stderr means a board-side traceback still shows up in the
         # error messages they raise. partition() is used (rather than indexing a
         # split) so this can never raise even if the framing is unexpected.
-        stdout, _, rest = buf.partition(b"\x04")
+        stdout, _, rest = bytes(buf[start:]).partition(b"\x04")
         stderr = rest.partition(b"\x04")[0]
         return (stdout + stderr).decode("utf-8", errors="replace")
 
+    def send_command_stream(self, scripts, read_timeout=None):
+        """Run ``scripts`` back-to-back without a round-trip per command.
+
+        On the classic raw REPL the next command is written while the board is
+        still executing the previous one (at most one is queued ahead), and
+        completions are counted from the ``\\x04>`` that ends each response.
+        In raw-paste mode the board only answers the next paste request once
+        it is back at the prompt, so that handshake doubles as the wait for
+        the previous command. Either way, output is read as it arrives so the
+        board never blocks on a full stdout buffer, and only the last command
+        is waited for. Responses are discarded: use this for commands whose
+        output does not matter, like upload blocks whose result is verified
+        afterwards. ``read_timeout`` bounds each command.
+
+        A ``bytes`` item is raw data for the command before it, which reads it
+        from stdin (see ``generate_transfer_script``). It is only written once
+        that command has printed ``READY_MARKER``, i.e. once the board is
+        actually reading. If the command finishes without printing it (e.g.
+        the file could not be opened), ``ValueError`` is raised with the
+        board's error output.
+        """
+        self.open()
+        self.ser.flushInput()
+        paste = getattr(self, "_raw_paste_window", None)
+        error = f"Board on {self.port} did not finish command within {read_timeout}s"
+        buf = bytearray()
+        accepted = b"\x04"
+        sent = finished = 0
+        tail = b""
+        for script in scripts:
+            deadline = (time.time() + read_timeout) if read_timeout is not None else None
+            if isinstance(script, bytes):
+                # Every earlier command has finished once the marker arrives.
+                # The commands still running (the reader among them) each end
+                # in \x04>, so that many of them means it failed instead.
+                # In raw-paste mode only the reader can still be running.
+                self._wait_for_reader(buf if paste else bytearray(tail), 1 if paste else sent - finished, deadline, error)
+                self.ser.write(script)
+                buf = bytearray()
+                accepted = b""  # the raw-paste ack came before the marker
+                finished, tail = sent - 1, b""
+                continue
+            data = (script if script.endswith("\n") else script + "\n").encode("utf-8")
+            if paste:
+                buf = self._write_raw_paste(data, deadline)
+                accepted = b"\x04"
+            else:
+                finished, tail = self._count_completions(finished, sent - 1, tail, deadline, error)
+                self.ser.write(data)
+                self.ser.write(b"\x04")
+            sent += 1
+
+        if not sent:
+            return
+        deadline = (time.time() + read_timeout) if read_timeout is not None else None
+        if paste:
+            self._read_completion(buf, accepted, deadline, error)
+        else:
+            self._count_completions(finished, sent, tail, deadline, error)
+
+    def _wait_for_reader(self, buf: bytearray, running: int, deadline, error: str):
+        """Read until the command that takes raw data prints ``READY_MARKER``.
+
+        ``running`` is how many commands, that one included, have yet to
+        finish. If all of them do first, the reader failed before asking for
+        the data, and its stderr is raised as a ``ValueError`` rather than
+        waiting out ``deadline`` for a marker that will never come.
+        """
+        while READY_MARKER not in buf:
+            if buf.count(b"\x04>") >= running:
+                # The failed command's response ends: <stdout> \x04 <stderr> \x04>
+                response = bytes(buf[: buf.rfind(b"\x04>")])
+                stderr = response[response.rfind(b"\x04") + 1 :].decode("utf-8", errors="replace").strip()
+                raise ValueError(f"Board on {self.port} could not receive a file: {stderr}")
+            self._read_more(buf, deadline, error)
+
+    def _count_completions(self, finished: int, target: int, tail: bytes, deadline, error: str):
+        """Read board output, counting finished classic raw REPL commands,
+        until at least ``target`` have finished. Returns the new count and the
+        last byte read (a ``\\x04>`` can straddle two reads)."""
+        while True:
+            waiting = self.ser.in_waiting
+            if not waiting and finished >= target:
+                return finished, tail
+            data = self.ser.read(waiting or 1)
+            if data:
+                data = tail + data
+                finished += data.count(b"\x04>")
+                tail = data[-1:]
+            elif deadline is not None and time.time() > deadline:
+                raise TimeoutError(error)
+
+    def _read_completion(self, buf: bytearray, accepted: bytes, deadline, error: str):
+        """Read one command's response to its end: the ``accepted`` marker,
+        the stdout and stderr EOT markers, then the ``>`` prompt."""
+        end = self._read_until(buf, accepted, deadline, error)
+        end = self._read_until(buf, b"\x04", deadline, error, end)
+        end = self._read_until(buf, b"\x04", deadline, error, end)
+        self._read_until(buf, b">", deadline, error, end)
+
+    def _read_more(self, buf: bytearray, deadline, error: str):
+        """Append whatever the board has sent to ``buf``, waiting until there
+        is at least one byte. Raises ``TimeoutError(error)`` past ``deadline``.
+
+        With nothing buffered this blocks in ``read(1)`` (for up to the port's
+        read timeout at a time), which returns as soon as a byte arrives,
+        rather than polling ``in_waiting`` on a sleep. The rest of that USB
+        packet has normally arrived by then and is taken in the same call.
+        A fixed large ``read(n)`` would be wrong here: pyserial waits for all
+        ``n`` bytes or the full timeout, delaying every short response.
+        """
+        while True:
+            data = self.ser.read(self.ser.in_waiting or 1)
+            if data:
+                buf += data
+                if self.ser.in_waiting > 0:
+                    buf += self.ser.read(self.ser.in_waiting)
+                return
+            if deadline is not None and time.time() > deadline:
+                raise TimeoutError(error)
+
+    def _read_until(self, buf: bytearray, marker: bytes, deadline, error: str, start: int = 0) -> int:
+        """Read into ``buf`` until ``marker`` occurs at or after ``start`` and
+        return the index just past it.
+
+        After each read only the new bytes (plus enough overlap for a marker
+        split across reads) are searched, so a long response arriving in many
+        pieces is scanned once rather than from ``start`` every time.
+        """
+        while (index := buf.find(marker, start)) == -1:
+            start = max(start, len(buf) - len(marker) + 1)
+            self._read_more(buf, deadline, error)
+        return index + len(marker)
+
+    def _write_raw_paste(self, data: bytes, deadline) -> bytearray:
+        """Send ``data`` as one raw-paste command, honoring the board's flow
+        control.
+
+        The board answers ``\\x05A\\x01`` with ``R\\x01`` and a window size,
+        then sends ``\\x01`` each time it has room for another window, so we
+        stream the whole script without per-block round-trips. A ``\\x04``
+        from the board means it stopped reading early (e.g. on a syntax error);
+        we end the paste and the error output follows as usual. Returns the
+        response bytes already received (that ``\\x04``, if any).
+        """
+        error = f"No raw-paste response from board on {self.port}"
+        self.ser.write(b"\x05A\x01")
+        buf = bytearray()
+        # Anything before the answer is the ">" prompt left by the previous command.
+        start = self._read_until(buf, b"R\x01", deadline, error)
+        while len(buf) < start + 2:
+            self._read_more(buf, deadline, error)
+        window = int.from_bytes(buf[start : start + 2], "little")
+
+        remaining = window
+        offset = 0
+        while offset < len(data):
+            while remaining == 0 or self.ser.in_waiting > 0:
+                byte = self.ser.read(1)
+                if byte == b"\x01":
+                    remaining += window
+                elif byte == b"\x04":
+                    self.ser.write(b"\x04")
+                    return bytearray(byte)
+                elif deadline is not None and time.time() > deadline:
+                    raise TimeoutError(error)
+            chunk = data[offset : offset + remaining]
+            self.ser.write(chunk)
+            offset += len(chunk)
+            remaining -= len(chunk)
+        self.ser.write(b"\x04")
+        return bytearray()
+
     def _read_with_retry(self, script, read_timeout=None, attempts=3) -> str:
         """Run an *idempotent* read-only command, retrying on a transient
         no-response.
@@ -229,61 +589,17 @@ class Ray:
 
     @staticmethod
     def generate_transfer_script(files: list[dict[str, str]], progress: bool = True):
-        """Yield the MicroPython script blocks that upload ``files`` to a board.
+        """Yield the MicroPython script lines that upload ``files`` to a board.
+
+        Each file's contents are yielded as ``bytes`` right after the
+        ``receive()`` line that reads them from stdin.
 
         Module-level (static) so the generated code can be unit-tested for
         valid Python syntax without a board attached.
         """
-        setup_lines = [
-            "import os",
-            "import binascii",
-            "import hashlib",
-            "f = None",
-            "hash_checks = []",
-            "def w(data):",
-            "    global f",
-            "    f.write(binascii.a2b_base64(data))",
-            "    f.flush()",
-            "",
-            "def hash_check(path, expected_hash):",
-            "    try:",
-            "        sha256 = hashlib.sha256()",
-            "        with open(path, 'rb') as f:",
-            "            while True:",
-            "                chunk = f.read(1024)",
-            "                if not chunk:",
-            "                    break",
-            "                sha256.update(chunk)",
-            "        hash = binascii.hexlify(sha256.digest()).decode('utf-8')",
-            "    except Exception:",
-            "        hash = ''",
-            "    global hash_checks",
-            "    hash_checks.append((path, hash == expected_hash))",
-            "",
-            "def mdir(path):",
-            "    try:",
-            "        os.mkdir(path)",
-            "    except OSError:",
-            "        pass",
-            "",
-            "def execute_file(path):",
-            "    module_path = path.replace('/', '.').replace('.py', '')",
-            "    if module_path.startswith('.'):",
-            "        module_path = module_path[1:]",
-            "    try:",
-            "        imported_module = __import__(module_path)",
-            "        if hasattr(imported_module, 'main'):",
-            "            imported_module.main()",
-            "    except Exception as e:",
-            "        print('Error message:', str(e))",
-            "        print('Error executing file:', path)",
-            "    try:",
-            "        os.remove(path)",
-            "    except OSError:",
-            "        pass",  # file probably removed itself
-        ]
+        yield TRANSFER_SETUP_SCRIPT
 
-        yield "\n".join(setup_lines)
+        made_dirs = set()
 
         for i, file_info in enumerate(files):
             # Print progress
@@ -292,76 +608,91 @@ class Ray:
 
             filename = file_info["filename"]
             file_metadata = file_info["metadata"]
-            file_contents = file_info["base64_contents"]
 
             if not filename:
                 raise ValueError(f"Missing filename in {file_info}")
 
             # For consistency, we always use a leading slash
-            if not filename.startswith("/"):
-                filename = "/" + filename
+            filename = Ray.board_path(filename)
 
+            # Create each directory once rather than for every file inside it.
+            # mdir() makes the parents too, so they count as made as well.
             dir_path = os.path.dirname(filename)
-            if dir_path not in ["", "/"]:
+            if dir_path not in ["", "/"] and dir_path not in made_dirs:
                 yield f"mdir('{dir_path}')"
+                while dir_path not in ["", "/"]:
+                    made_dirs.add(dir_path)
+                    dir_path = os.path.dirname(dir_path)
 
-            yield f"f = open('{filename}', 'wb')"
-
-            # Process base64 data in chunks
-            chunk_size = COMMAND_CHUNK_SIZE - 20
-            for i in range(0, len(file_contents), chunk_size):
-                chunk = file_contents[i : i + chunk_size]
-                yield f"w('{chunk}')"
-
-            yield "f.close()"
+            # The file's raw bytes go over stdin right after the command that
+            # reads them (yielded as ``bytes``), rather than as base64 literals.
+            decoded_contents = Ray.file_contents(file_info)
+            yield f"receive('{filename}', {len(decoded_contents)})"
+            yield decoded_contents
 
-            # calculate the checksum based on the file contents
-            hasher = hashlib.sha256()
-            decoded_contents = base64.b64decode(file_contents)
-            hasher.update(decoded_contents)
-            expected_hash = hasher.hexdigest()
+            expected_hash = Ray.file_sha256(file_info)
 
             yield f"hash_check('{filename}', '{expected_hash}')"
             # If the file is marked as executable, run it
             if file_metadata.get("execute", False):
                 yield f"execute_file('{filename}')"
 
-    def write_update_to_board(self, update_files: list[dict[str, str]]):
-        """Upload the given update files to the board over the raw REPL,
-        then verify every file's SHA256 on the board."""
-        # figure out what files need to be updated
-        required_files = self.get_files_to_update(update_files)
+    @staticmethod
+    def _script_blocks(script_lines):
+        """Join script lines into command-sized blocks, passing file data
+        (``bytes``) through between them.
 
-        # Generate the script lines in a generator
-        script_lines = self.generate_transfer_script([file_info for file_info in update_files if file_info["filename"] in required_files or file_info["metadata"].get("execute", False)])
+        Blocks stay bounded even in raw-paste mode: the board compiles a
+        command whole, so one command holding every file's data would not fit
+        in its RAM.
+        """
         current_block = []
         current_len = 0
-
-        # Iterate over the script lines and send them in chunks
-        for i, line in enumerate(script_lines):
-            if current_len + len(line) > COMMAND_CHUNK_SIZE:
-                # send the block
-                block_script = "\n".join(current_block)
-                self.send_command(block_script, ignore_response=True, wait_for_completion=True, read_timeout=60)
-                current_block = [line]
-                current_len = len(line)
-            else:
-                current_block.append(line)
-                current_len += len(line)
-
-        # Send any remainder
+        for line in script_lines:
+            if isinstance(line, bytes):
+                # File data follows the command that reads it, so that
+                # command has to end its block.
+                if current_block:
+                    yield "\n".join(current_block)
+                    current_block = []
+                    current_len = 0
+                yield line
+                continue
+            if current_block and current_len + len(line) > COMMAND_CHUNK_SIZE:
+                yield "\n".join(current_block)
+                current_block = []
+                current_len = 0
+            current_block.append(line)
+            current_len += len(line)
         if current_block:
-            block_script = "\n".join(current_block)
-            self.send_command(block_script, ignore_response=True, wait_for_completion=True, read_timeout=60)
+            yield "\n".join(current_block)
 
-        print()
+    def write_update_to_board(self, update_files: list[dict[str, str]], progress: bool = True):
+        """Upload the given update files to the board over the raw REPL,
+        then verify every file's SHA256 on the board. ``progress`` shows the
+        file being uploaded on a self-overwriting status line."""
+        # figure out what files need to be updated
+        required_files = self.get_files_to_update(update_files)
+
+        # Generate the script lines in a generator
+        script_lines = self.generate_transfer_script(
+            [file_info for file_info in update_files if self.board_path(file_info["filename"]) in required_files or file_info["metadata"].get("execute", False)],
+            progress=progress,
+        )
+        # Stream the blocks without waiting on each one; the hash-check read
+        # below is the synchronous barrier that confirms the upload.
+        self.send_command_stream(self._script_blocks(script_lines), read_timeout=60)
+        if progress:
+            print()
 
         # Ask the board which hash checks failed. This read comes right after a
         # long burst of uploads and is the single spot most exposed to a rare,
         # transient USB stall, so give it a few attempts before giving up. The
         # command only prints existing board state (``hash_checks`` persists in
         # the REPL globals across the reconnect), so it is safe to repeat.
-        output = self._read_with_retry("print([check for check in hash_checks if not check[1]])", read_timeout=30)
+        # The failed paths come back as JSON (like sha256_index's dict), so
+        # filenames with quotes in them cannot break the parse.
+        output = self._read_with_retry("import json\nprint(json.dumps([path for path, ok in hash_checks if not ok]))", read_timeout=30)
 
         # find first [
         start = output.find("[")
@@ -370,12 +701,15 @@ class Ray:
         if start == -1 or end == -1:
             raise ValueError(f"Board failed to return hash checks: {output}")
         # remove anything before first [ or after last ]
-        output = output[start : end + 1].strip()
-        if output == "[]":
+        try:
+            failed = json.loads(output[start : end + 1])
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Board failed to return hash checks: {output}") from e
+        if not failed:
             ui.detail("all files verified on board", indent=2)
             return
 
-        raise ValueError(f"Board failed to upload files: {output}")
+        raise ValueError(f"Board failed to upload files: {', '.join(failed)}")
 
     def _drop_serial(self):
         """Close the underlying serial handle without de-registering the
@@ -443,19 +777,27 @@ class Ray:
     def wipe_board(self):
         """
         Remove all files and directories on the board's filesystem.
+
+        The tree is walked with an explicit stack rather than recursion, and
+        ``os.ilistdir`` already says which entries are directories, so no
+        entry needs a failed ``os.remove`` to find that out. Directories are
+        removed last, deepest first.
         """
         script = [
             "import os",
-            "def remove(path):",
-            "    try:",
-            "        os.remove(path)",
-            "    except OSError:",
-            "        for entry in os.listdir(path):",
-            "            remove(path + '/' + entry)",
-            "        os.rmdir(path)",
-            "",
-            "for entry in os.listdir('/'):",
-            "    remove('/' + entry)",
+            "dirs = []",
+            "stack = ['']",
+            "while stack:",
+            "    path = stack.pop()",
+            "    for entry in os.ilistdir(path or '/'):",
+            "        full_path = path + '/' + entry[0]",
+            "        if entry[1] == 0x4000:",
+            "            stack.append(full_path)",
+            "            dirs.append(full_path)",
+            "        else:",
+            "            os.remove(full_path)",
+            "for path in reversed(dirs):",
+            "    os.rmdir(path)",
         ]
         self.send_command(script)
 
@@ -500,7 +842,11 @@ class Ray:
             "    _m = ''",
             "print('<<<' + _m + '>>>')",
         ]
-        machine = self._exec_value(script, timeout).upper()
+        return self._processor_from_machine(self._exec_value(script, timeout))
+
+    @staticmethod
+    def _processor_from_machine(machine: str) -> str | None:
+        machine = machine.upper()
         if "RP2350" in machine:
             return "rp2350"
         if "RP2040" in machine:
@@ -546,22 +892,46 @@ class Ray:
             legacy System 9 / 11 board)
 
         The system probe is skipped for Pico W boards, which by definition run
-        the legacy System 9 / 11 firmware.
+        the legacy System 9 / 11 firmware. Both probes go to the board as one
+        command, so identifying a board costs a single round trip.
         """
-        processor = self.detect_processor(timeout)
+        script = [
+            "import os, json",
+            "try:",
+            "    _m = os.uname().machine",
+            "except Exception:",
+            "    _m = ''",
+            "_s = ''",
+            "if 'RP2350' in _m.upper():",
+            "    try:",
+            "        import systemConfig",
+            "        _s = systemConfig.vectorSystem",
+            "    except Exception:",
+            "        _s = ''",
+            "print('<<<' + json.dumps([_m, str(_s)]) + '>>>')",
+        ]
+        try:
+            machine, system = json.loads(self._exec_value(script, timeout))
+        except (TypeError, ValueError):
+            machine, system = "", ""
+        processor = self._processor_from_machine(machine)
         board = self.PROCESSOR_BOARD_NAMES.get(processor) if processor else None
 
-        system = None
-        if processor == "rp2350":
-            system = self.detect_system(timeout)
-
-        return {"processor": processor, "board": board, "system": system}
+        return {"processor": processor, "board": board, "system": system or None}
 
-    def sha256_index(self) -> dict[str, str]:
+    def sha256_index(self, sizes: dict[str, int] | None = None) -> dict[str, str]:
         """
         Get the SHA256 of every file on the board as a dict.
-        We run code that collects file : digest in JSON, then parse locally.
-        Recursively walks through all directories.
+        The board prints one ``[path, digest]`` JSON line per file as soon as
+        it is hashed, so it never holds the whole index in its RAM, and the
+        lines are collected into the dict locally. Recursively walks through
+        all directories.
+
+        With ``sizes`` (path -> expected size in bytes) only files listed there
+        whose size on the board matches are hashed; the rest are left out of
+        the index, since a file of the wrong size differs anyway and a stat is
+        far cheaper than hashing it. Those paths are stat'ed directly, so the
+        rest of the filesystem is not walked at all.
         """
         script_lines = [
             "import os",
@@ -569,7 +939,24 @@ class Ray:
             "import json",
             "import binascii",
             "",
-            "files = {}",
+            f"sizes = {json.dumps(sizes) if sizes is not None else None}",
+            # One reusable block-sized buffer, so hashing a file allocates
+            # nothing per read.
+            f"buf = bytearray({RECEIVE_CHUNK_SIZE})",
+            "view = memoryview(buf)",
+            "",
+            "def found(path, value):",
+            "    print(json.dumps([path, value]))",
+            "",
+            "def hash_file(path):",
+            "    sha256 = hashlib.sha256()",
+            "    with open(path, 'rb') as f:",
+            "        while True:",
+            "            n = f.readinto(buf)",
+            "            if not n:",
+            "                break",
+            "            sha256.update(view[:n])",
+            "    found(path, binascii.hexlify(sha256.digest()).decode('utf-8'))",
             "",
             "def process_directory(path):",
             "    try:",
@@ -577,76 +964,124 @@ class Ray:
             "            full_path = path + '/' + entry if path != '/' else '/' + entry",
             "            try:",
             "                # Check if entry is a directory",
-            "                is_dir = os.stat(full_path)[0] & 0x4000",
+            "                stat = os.stat(full_path)",
+            "                is_dir = stat[0] & 0x4000",
             "                if is_dir:",
             "                    process_directory(full_path)  # Recurse into directory",
             "                else:",
-            "                    # Calculate hash for file",
-            "                    sha256 = hashlib.sha256()",
-            "                    with open(full_path, 'rb') as f:",
-            "                        while True:",
-            "                            chunk = f.read(1024)",
-            "                            if not chunk:",
-            "                                break",
-            "                            sha256.update(chunk)",
-            "                    files[full_path] = binascii.hexlify(sha256.digest()).decode('utf-8')",
+            "                    hash_file(full_path)",
             "            except Exception as e:",
-            "                files[full_path] = f'Error: {str(e)}'",
+            "                found(full_path, f'Error: {str(e)}')",
             "    except Exception as e:",
-            "        files[path] = f'Error listing directory: {str(e)}'",
+            "        found(path, f'Error listing directory: {str(e)}')",
             "",
-            "# Start recursive processing from root",
-            "process_directory('/')",
+            "if sizes is None:",
+            "    # Start recursive processing from root",
+            "    process_directory('/')",
+            "else:",
+            "    for path, size in sizes.items():",
+            "        try:",
+            "            stat = os.stat(path)",
+            "        except OSError:",
+            "            continue  # not on the board yet",
+            "        if stat[0] & 0x4000 or stat[6] != size:",
+            "            continue  # a directory, or a different size",
+            "        try:",
+            "            hash_file(path)",
+            "        except Exception as e:",
+            "            found(path, f'Error: {str(e)}')",
             "",
-            "print(json.dumps(files))",
+            f"print({SHA256_INDEX_END!r})",
         ]
         # Bound the read so a board that is not actually at a usable REPL
         # (e.g. still booting its application) surfaces as a TimeoutError
         # instead of hanging this call forever.
         output = self.send_command(script_lines, read_timeout=120)
 
-        # remove anything before first { or after last }
-        start = output.find("{")
-        end = output.rfind("}")
-        if start == -1 or end == -1:
-            raise ValueError(f"Board returned invalid JSON for file hashes: {output}")
+        if SHA256_INDEX_END not in output:
+            raise ValueError(f"Board returned an incomplete file hash index: {output}")
 
-        output = output[start : end + 1].strip()
+        index = {}
+        for line in output.splitlines():
+            line = line.strip()
+            if not line.startswith("["):
+                continue
+            try:
+                path, digest = json.loads(line)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Board returned invalid JSON for file hashes: {line}") from e
+            index[path] = digest
+        return index
 
-        if len(output) == 0:
-            return {}
+    @staticmethod
+    def board_path(filename: str) -> str:
+        """An update file's absolute path on the board."""
+        return filename if filename.startswith("/") else "/" + filename
 
-        try:
-            return json.loads(output)
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Board returned invalid JSON for file hashes: {output}") from e
+    @staticmethod
+    def file_contents(file_info: dict) -> bytes:
+        """An update file's decoded contents.
+
+        Cached in the file's dict under ``"contents"``: the same update files
+        go to every connected board, and each needs them for both the hash
+        and the upload, so they are decoded once rather than per use.
+        """
+        if "contents" not in file_info:
+            file_info["contents"] = binascii.a2b_base64(file_info["base64_contents"])
+        return file_info["contents"]
+
+    @staticmethod
+    def file_sha256(file_info: dict) -> str:
+        """SHA256 hex digest of an update file's decoded contents.
+
+        Cached in the file's dict under ``"sha256"``, so comparing against the
+        board, generating the hash checks, and the same update going to the
+        next board all reuse one hash.
+        """
+        if "sha256" not in file_info:
+            # One update() over the whole buffer lets OpenSSL hash it in a single
+            # call (SHA-NI where the CPU has it). It is an integrity check, not
+            # a security control, hence usedforsecurity=False on FIPS builds.
+            file_info["sha256"] = hashlib.sha256(Ray.file_contents(file_info), usedforsecurity=False).hexdigest()
+        return file_info["sha256"]
 
     def get_files_to_update(self, expected_files: list[dict[str, str]]) -> list[str]:
         required_files = []
 
-        expected_sha256_index = {}
+        # Fetch the board's index while hashing the local files: the former is
+        # serial I/O and the latter CPU work (hashlib releases the GIL), so
+        # this takes as long as the slower of the two instead of their sum.
+        # Only files the update expects, at the size it expects, are worth
+        # hashing on the board. The sizes come from the base64 lengths, so
+        # this needs no decoding; a wrong guess only costs an extra upload.
+        # ``expected_files`` is shared by every board being flashed at once, so
+        # it is only read here: paths are normalised into locals, and the hash
+        # cache is expected to have been filled before the boards started.
+        sizes = {}
         for file_info in expected_files:
-            # add / to the start of the filename if it doesn't exist
-            if not file_info["filename"].startswith("/"):
-                file_info["filename"] = "/" + file_info["filename"]
-
-            hasher = hashlib.sha256()
-            # decode the base64 contents to bytes
-            decoded_contents = base64.b64decode(file_info["base64_contents"])
-            hasher.update(decoded_contents)
-            if file_info["filename"] in expected_sha256_index:
-                # If the file already exists, check if the hashes match
-                # This could happen for files that the update modifies or
-                # if a filename gets reused by executeable files
-                if expected_sha256_index[file_info["filename"]] != hasher.hexdigest():
-                    required_files.append(file_info["filename"])
-                    # remove the file from the expected list, we don't need to check this again
-                    del expected_sha256_index[file_info["filename"]]
-            else:
-                expected_sha256_index[file_info["filename"]] = hasher.hexdigest()
-
-        # Get the SHA256 index from the board
-        sha256_index = self.sha256_index()
+            contents = file_info["base64_contents"]
+            sizes[self.board_path(file_info["filename"])] = len(contents) * 3 // 4 - (len(contents) - len(contents.rstrip("=")))
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            board_index = executor.submit(self.sha256_index, sizes)
+
+            expected_sha256_index = {}
+            for file_info in expected_files:
+                filename = self.board_path(file_info["filename"])
+                digest = self.file_sha256(file_info)
+                if filename in expected_sha256_index:
+                    # If the file already exists, check if the hashes match
+                    # This could happen for files that the update modifies or
+                    # if a filename gets reused by executeable files
+                    if expected_sha256_index[filename] != digest:
+                        required_files.append(filename)
+                        # remove the file from the expected list, we don't need to check this again
+                        del expected_sha256_index[filename]
+                else:
+                    expected_sha256_index[filename] = digest
+
+            # Get the SHA256 index from the board
+            sha256_index = board_index.result()
 
         for file in expected_sha256_index.keys():
             if file not in sha256_index:
@@ -662,8 +1097,9 @@ class Ray:
         This is a blocking call that will run until the connection is closed.
         """
         self.open(raw_repl=False)
+        # Reads can now end mid-character, so decode incrementally.
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
         while True:
-            if self.ser.in_waiting > 0:
-                chunk = self.ser.read(self.ser.in_waiting)
-                print(chunk.decode("utf-8", errors="replace"), end="")
-            time.sleep(0.01)
+            chunk = self.ser.read(self.ser.in_waiting or 1)
+            if chunk:
+                print(decoder.decode(chunk), end="")
@@ -1,3 +1,5 @@
+import select
+import socket
 import sys
 import time
 
@@ -16,27 +18,118 @@ def graceful_exit(now=False):
     sys.exit(0)
 
 
+# How often wait_for re-checks its condition when no device event has
+# arrived, as a safety net for changes the event sources cannot see.
+RECHECK_INTERVAL = 5.0
+
+_NETLINK_KOBJECT_UEVENT = 15
+_UEVENT_SUBSYSTEMS = (b"SUBSYSTEM=usb", b"SUBSYSTEM=tty", b"SUBSYSTEM=block")
+
+
+class DeviceWatch:
+    """Wake up when USB devices or mounted filesystems change.
+
+    On Linux this listens for kernel hot-plug events (which announce a board's
+    serial port) on a netlink socket, and watches ``/proc/self/mounts`` (which
+    announces a bootloader drive being mounted or unmounted). ``wait()`` then
+    sleeps until one of them fires instead of re-scanning on every tick.
+    Elsewhere, or if either source cannot be opened, ``wait()`` just sleeps
+    and reports a possible change every time, which is the old polling
+    behavior.
+    """
+
+    def __init__(self):
+        self._uevents = None
+        self._mounts = None
+        if not sys.platform.startswith("linux"):
+            return
+        try:
+            self._uevents = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, _NETLINK_KOBJECT_UEVENT)
+            self._uevents.bind((0, 1))  # multicast group 1: kernel uevents
+            self._uevents.setblocking(False)
+            self._mounts = open("/proc/self/mounts")
+        except (OSError, AttributeError):
+            self.close()
+
+    @property
+    def event_driven(self) -> bool:
+        return self._mounts is not None
+
+    def wait(self, timeout: float) -> bool:
+        """Block for up to ``timeout`` seconds. Returns True if devices may
+        have changed."""
+        if not self.event_driven:
+            time.sleep(timeout)
+            return True
+        readable, _, exceptional = select.select([self._uevents], [], [self._mounts], timeout)
+        changed = bool(exceptional)  # the mount table changed
+        if readable:
+            while True:
+                try:
+                    message = self._uevents.recv(8192)
+                except BlockingIOError:
+                    break
+                except OSError:
+                    # Most likely ENOBUFS: a burst of uevents (several boards
+                    # resetting at once) overflowed the socket and some were
+                    # dropped, so assume something changed and recheck.
+                    changed = True
+                    break
+                if any(subsystem in message for subsystem in _UEVENT_SUBSYSTEMS):
+                    changed = True
+        return changed
+
+    def close(self):
+        for source in (self._uevents, self._mounts):
+            if source is not None:
+                source.close()
+        self._uevents = self._mounts = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 def wait_for(listen_func, timeout=10):
     """
     Wait for a condition to be met or timeout.
-    :param listen_func: Function to call to check the condition.
-    :param msg: Message to display while waiting.
+    :param listen_func: Function to call to check the condition. Returns
+        ``(done, status)``, where ``status`` is the text to show while waiting.
     :param timeout: Timeout in seconds.
+
+    The dots animate every half second, but ``listen_func`` is only called
+    again when ``DeviceWatch`` reports a device change (or every
+    ``RECHECK_INTERVAL`` seconds); where no event source is available it is
+    called on every tick.
     """
     start_time = time.monotonic()
     dots = 0
+    status = None
+    last_check = start_time
     try:
-        while True:
-            if timeout is not None and (time.monotonic() - start_time) > timeout:
-                raise TimeoutError(f"Timeout after waiting for {timeout} seconds.")
-            time.sleep(0.5)
-            dots = (dots + 1) % 5
-            print("\r", end="")
-            return_val = listen_func()
-            # Trailing padding clears the dots from the previous, longer redraw.
-            print("." * dots + " " * (5 - dots), end="", flush=True)
-            if return_val:
-                print()
-                break
+        with DeviceWatch() as watch:
+            while True:
+                if timeout is not None and (time.monotonic() - start_time) > timeout:
+                    raise TimeoutError(f"Timeout after waiting for {timeout} seconds.")
+                changed = watch.wait(0.5)
+                dots = (dots + 1) % 5
+                if changed or status is None or time.monotonic() - last_check >= RECHECK_INTERVAL:
+                    return_val, frame = listen_func()
+                    last_check = time.monotonic()
+                    # Later redraws repeat only the last line of the status, so
+                    # one-off messages above it are not printed again.
+                    status = frame.rpartition("\n")[2]
+                else:
+                    return_val = False
+                    frame = status
+                # The whole frame goes out as one write and one flush per tick.
+                # Trailing padding clears the dots from the previous, longer redraw.
+                sys.stdout.write("\r" + frame + "." * dots + " " * (5 - dots))
+                sys.stdout.flush()
+                if return_val:
+                    print()
+                    break
     except KeyboardInterrupt:
         graceful_exit(now=True)
@@ -4,10 +4,15 @@ import struct
 
 import pytest
 
+import src.core as core
 from src.core import (
     DEFAULT_SYSTEM,
     SYSTEM_LABEL,
     SYSTEM_UPDATE_ASSET,
+    copy_uf2_to_all,
+    copy_uf2_to_bootloader,
+    count_connected_devices,
+    find_connected_devices,
     find_system_firmware,
     firmware_system,
     get_files_from_update_file,
@@ -88,6 +93,12 @@ class TestUf2TargetProcessor:
         path.write_bytes(b"UF2\n" + b"\x00" * 10)
         assert uf2_target_processor(str(path)) is None
 
+    def test_trailing_partial_block_is_ignored(self, tmp_path):
+        path = write_uf2(tmp_path, "fw.uf2", [RP2040_FAMILY])
+        with open(path, "ab") as f:
+            f.write(make_uf2_block(RP2350_ARM_S_FAMILY)[:300])
+        assert uf2_target_processor(path) == "rp2040"
+
     def test_non_uf2_garbage(self, tmp_path):
         path = tmp_path / "garbage.uf2"
         path.write_bytes(b"\xff" * 1024)
@@ -164,6 +175,183 @@ class TestSystemTables:
         assert any("wpc" in n.lower() for n in names)
 
 
+class TestFindConnectedDevices:
+    def test_returns_ports_and_drives(self, monkeypatch):
+        monkeypatch.setattr(core.Ray, "find_board_ports", staticmethod(lambda: ["COM3", "COM4"]))
+        monkeypatch.setattr(core, "list_rpi_rp2_drives", lambda: ["E:\\"])
+        assert find_connected_devices() == (["COM3", "COM4"], ["E:\\"])
+
+    def test_nothing_connected(self, monkeypatch):
+        monkeypatch.setattr(core.Ray, "find_board_ports", staticmethod(lambda: []))
+        monkeypatch.setattr(core, "list_rpi_rp2_drives", lambda: [])
+        assert find_connected_devices() == ([], [])
+
+    def test_count_adds_ports_and_drives(self, monkeypatch):
+        monkeypatch.setattr(core.Ray, "find_board_ports", staticmethod(lambda: ["COM3"]))
+        monkeypatch.setattr(core, "list_rpi_rp2_drives", lambda: ["E:\\", "F:\\"])
+        assert count_connected_devices() == 3
+
+
+class FakeWatch:
+    """DeviceWatch stand-in that replays ``changes`` and keeps a clock."""
+
+    def __init__(self, changes, clock):
+        self.changes = list(changes)
+        self.clock = clock
+        self.waits = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def wait(self, timeout):
+        self.waits.append(timeout)
+        self.clock[0] += timeout
+        return self.changes.pop(0) if self.changes else True
+
+
+class TestSettleDrives:
+    def _watch(self, monkeypatch, changes):
+        clock = [0.0]
+        watch = FakeWatch(changes, clock)
+        monkeypatch.setattr(core, "DeviceWatch", lambda: watch)
+        monkeypatch.setattr(core.time, "monotonic", lambda: clock[0])
+        return watch
+
+    def test_returns_after_a_quiet_period(self, monkeypatch):
+        watch = self._watch(monkeypatch, [True, False])
+        core.settle_drives(quiet=1.0, timeout=5.0)
+        assert watch.waits == [1.0, 1.0]
+
+    def test_gives_up_at_the_timeout(self, monkeypatch):
+        watch = self._watch(monkeypatch, [])
+        core.settle_drives(quiet=2.0, timeout=5.0)
+        assert watch.waits == [2.0, 2.0, 1.0]
+
+
+class TestWindowsRemovableDrives:
+    def test_only_present_removable_letters(self, monkeypatch):
+        import ctypes
+
+        types_by_root = {"C:\\": 3, "D:\\": 5, "E:\\": 2, "F:\\": 4}
+        kernel32 = type("Kernel32", (), {"GetLogicalDrives": staticmethod(lambda: 0b111100), "GetDriveTypeW": staticmethod(types_by_root.get)})
+        monkeypatch.setattr(ctypes, "windll", type("WinDLL", (), {"kernel32": kernel32}), raising=False)
+        assert core._windows_removable_drives() == ["E"]
+
+    def test_bootloader_drives_found_among_them(self, monkeypatch):
+        monkeypatch.setattr(core.os, "name", "nt")
+        monkeypatch.setattr(core, "_windows_removable_drives", lambda: ["E", "F", "G"])
+        monkeypatch.setattr(core.os.path, "exists", lambda path: path in ("E:\\INFO_UF2.TXT", "G:\\INFO_UF2.TXT"))
+        assert core.list_rpi_rp2_drives() == ["E:\\", "G:\\"]
+
+    def test_every_letter_without_the_drive_apis(self, monkeypatch):
+        import ctypes
+
+        monkeypatch.delattr(ctypes, "windll", raising=False)
+        assert len(core._windows_removable_drives()) == 26
+
+
+class TestFindUf2Mounts:
+    def _drive(self, path):
+        path.mkdir(parents=True)
+        (path / "INFO_UF2.TXT").write_text("UF2 Bootloader\n")
+        return str(path)
+
+    def test_macos_and_linux_layouts(self, tmp_path):
+        volumes = tmp_path / "Volumes"
+        mac = self._drive(volumes / "RPI-RP2")
+        linux = self._drive(volumes / "user" / "RP2350")
+        (volumes / "Backup").mkdir()
+        assert core._find_uf2_mounts(str(volumes)) == [mac, linux]
+
+    def test_does_not_descend_into_volumes(self, tmp_path):
+        self._drive(tmp_path / "media" / "user" / "USB" / "nested")
+        assert core._find_uf2_mounts(str(tmp_path / "media")) == []
+
+    def test_missing_directory(self, tmp_path):
+        assert core._find_uf2_mounts(str(tmp_path / "nope")) == []
+
+    def test_linux_reads_the_mount_table(self, monkeypatch, tmp_path):
+        drive = self._drive(tmp_path / "mnt" / "my pico")
+        other = tmp_path / "stick"
+        other.mkdir()
+        mounts = tmp_path / "mounts"
+        escaped = drive.replace(" ", "\\040")
+        mounts.write_text(f"/dev/sda1 / ext4 rw 0 0\n/dev/sdb1 {other} vfat rw 0 0\n/dev/sdc1 {escaped} vfat rw,nosuid 0 0\n")
+        monkeypatch.setattr(core.os, "name", "posix")
+        monkeypatch.setattr(core.sys, "platform", "linux")
+        read_mounts = core._fat_mount_points
+        monkeypatch.setattr(core, "_fat_mount_points", lambda: read_mounts(str(mounts)))
+        assert core.list_rpi_rp2_drives() == [drive]
+
+    def test_unreadable_mount_table(self, tmp_path):
+        assert core._fat_mount_points(str(tmp_path / "nope")) is None
+
+    def test_posix_mount_points_searched(self, monkeypatch):
+        monkeypatch.setattr(core.os, "name", "posix")
+        monkeypatch.setattr(core.sys, "platform", "darwin")
+        monkeypatch.setattr(core, "_find_uf2_mounts", lambda drive_dir: [drive_dir + "/RPI-RP2"])
+        assert core.list_rpi_rp2_drives() == ["/Volumes/RPI-RP2", "/media/RPI-RP2", "/run/media/RPI-RP2"]
+
+
+class TestGetAllBoardsIntoBootloader:
+    def test_every_running_board_is_reset(self, monkeypatch):
+        reset = []
+
+        class FakeRay:
+            def __init__(self, port):
+                self.port = port
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                pass
+
+            def enter_bootloader_mode(self):
+                reset.append(self.port)
+
+        monkeypatch.setattr(core, "Ray", FakeRay)
+        monkeypatch.setattr(core, "find_connected_devices", lambda: (["COM3", "COM4", "COM5"], ["E:\\"]))
+        monkeypatch.setattr(core, "wait_for", lambda listen_func, timeout=None: None)
+        core.get_all_boards_into_bootloader()
+        assert sorted(reset) == ["COM3", "COM4", "COM5"]
+
+
+class TestCopyUf2ToBootloader:
+    def test_copies_image_onto_drive(self, tmp_path):
+        image = write_uf2(tmp_path, "fw.uf2", [RP2040_FAMILY])
+        drive = tmp_path / "RPI-RP2"
+        drive.mkdir()
+        copy_uf2_to_bootloader(image, str(drive))
+        assert (drive / "fw.uf2").read_bytes() == (tmp_path / "fw.uf2").read_bytes()
+
+    def test_empty_image(self, tmp_path):
+        # An empty file cannot be memory-mapped; it must still copy cleanly.
+        image = tmp_path / "empty.uf2"
+        image.write_bytes(b"")
+        drive = tmp_path / "RPI-RP2"
+        drive.mkdir()
+        copy_uf2_to_bootloader(str(image), str(drive))
+        assert (drive / "empty.uf2").read_bytes() == b""
+
+    def test_copies_onto_every_drive(self, tmp_path):
+        image = write_uf2(tmp_path, "fw.uf2", [RP2040_FAMILY])
+        drives = [tmp_path / f"RPI-RP2-{i}" for i in range(3)]
+        for drive in drives:
+            drive.mkdir()
+        copy_uf2_to_all(image, [str(drive) for drive in drives])
+        for drive in drives:
+            assert (drive / "fw.uf2").read_bytes() == (tmp_path / "fw.uf2").read_bytes()
+
+    def test_failed_copy_is_raised(self, tmp_path):
+        image = write_uf2(tmp_path, "fw.uf2", [RP2040_FAMILY])
+        with pytest.raises(OSError):
+            copy_uf2_to_all(image, [str(tmp_path / "missing-drive")])
+
+
 def make_update_file(tmp_path, files, metadata=None):
     """Build an update file in the vector 1.0 format:
     line 1 metadata JSON, then filename{json-metadata}base64 lines,
@@ -178,6 +366,31 @@ def make_update_file(tmp_path, files, metadata=None):
     return str(path)
 
 
+class FakeBoard:
+    def __init__(self, port, ready=True):
+        self.port = port
+        self.ready = ready
+        self.uploads = []
+
+    def wait_until_ready(self, on_wait=None):
+        return self.ready
+
+    def write_update_to_board(self, update_files, progress=True):
+        self.uploads.append((update_files, progress))
+
+
+class TestFlashBoardSoftware:
+    def test_uploads_when_ready(self):
+        board = FakeBoard("COM3")
+        assert core._flash_board_software(board, ["file"], 0, 2, progress=False) is True
+        assert board.uploads == [(["file"], False)]
+
+    def test_reports_board_that_never_became_ready(self):
+        board = FakeBoard("COM4", ready=False)
+        assert core._flash_board_software(board, ["file"], 1, 2, progress=False) is False
+        assert board.uploads == []
+
+
 class TestGetFilesFromUpdateFile:
     def test_parses_files(self, tmp_path):
         path = make_update_file(
@@ -189,7 +402,8 @@ class TestGetFilesFromUpdateFile:
         )
         files = get_files_from_update_file(path)
         assert len(files) == 2
-        assert files[0]["filename"] == "main.py"
+        assert files[0]["filename"] == "/main.py"
+        assert files[1]["filename"] == "/lib/util.py"
         assert base64.b64decode(files[0]["base64_contents"]) == b"print('hi')"
         assert files[1]["metadata"] == {"execute": True}
 
@@ -199,4 +413,4 @@ class TestGetFilesFromUpdateFile:
         with open(path, "a") as f:
             f.write("\n\n")
         files = get_files_from_update_file(path)
-        assert [f["filename"] for f in files] == ["a.py"]
+        assert [f["filename"] for f in files] == ["/a.py"]
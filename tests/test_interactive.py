@@ -1,5 +1,6 @@
 import hashlib
 import json
+import os
 
 import pytest
 
@@ -102,3 +103,161 @@ class TestValidateUpdateFile:
         path = write_update_file(tmp_path, self.CONTENT, digest)
         monkeypatch.setattr(interactive.rsa, "verify", lambda *a, **k: "SHA-256")
         assert validate_update_file(path) is True
+
+
+class FakePrompt:
+    """Stand-in for an InquirerPy prompt that answers with the queued values."""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.calls = []
+
+    def __call__(self, **kwargs):
+        self.calls.append(kwargs)
+        return self
+
+    def execute(self):
+        return self.answers.pop(0)
+
+
+@pytest.fixture
+def prompts(monkeypatch):
+    """Patch the select/checkbox/text prompts; set ``.answers`` on each to script them."""
+    from InquirerPy import inquirer
+
+    fakes = {name: FakePrompt([]) for name in ("select", "checkbox")}
+    for name, fake in fakes.items():
+        monkeypatch.setattr(inquirer, name, fake)
+    fakes["text"] = FakePrompt([])
+    monkeypatch.setattr(inquirer, "text", lambda message: fakes["text"](message=message))
+    return fakes
+
+
+@pytest.fixture
+def exits(monkeypatch):
+    calls = []
+
+    def fake_exit(now=False):
+        calls.append(now)
+        raise SystemExit
+
+    monkeypatch.setattr(interactive, "graceful_exit", fake_exit)
+    return calls
+
+
+class TestSelectFirmwareAndSystem:
+    @pytest.fixture(autouse=True)
+    def bundled(self, monkeypatch):
+        # Only the first series in the menu has firmware; the second is "coming soon".
+        self.available, self.coming_soon = interactive.SERIES_MENU_ORDER[:2]
+        monkeypatch.setattr(interactive, "list_bundled_uf2", lambda: [])
+        monkeypatch.setattr(interactive, "find_system_firmware", lambda system, bundled: f"/fw/{system}.uf2" if system == self.available else None)
+
+    def test_series_choice_returns_its_firmware(self, prompts):
+        prompts["select"].answers = [(self.available, f"/fw/{self.available}.uf2")]
+        assert interactive.select_firmware_and_system() == (f"/fw/{self.available}.uf2", self.available)
+        assert prompts["select"].calls[0]["default"] == (self.available, f"/fw/{self.available}.uf2")
+
+    def test_coming_soon_series_prompts_again(self, prompts):
+        prompts["select"].answers = [(self.coming_soon, None), (self.available, f"/fw/{self.available}.uf2")]
+        assert interactive.select_firmware_and_system() == (f"/fw/{self.available}.uf2", self.available)
+        assert len(prompts["select"].calls) == 2
+
+    def test_custom_asks_for_a_path(self, prompts, monkeypatch, tmp_path):
+        uf2 = tmp_path / "custom.uf2"
+        uf2.write_bytes(b"")
+        monkeypatch.setattr(interactive, "firmware_system", lambda path: "wpc")
+        prompts["select"].answers = ["custom"]
+        prompts["text"].answers = [str(uf2)]
+        assert interactive.select_firmware_and_system() == (str(uf2), "wpc")
+
+    def test_exit(self, prompts, exits):
+        prompts["select"].answers = [None]
+        with pytest.raises(SystemExit):
+            interactive.select_firmware_and_system()
+        assert exits == [True]
+
+
+class TestPromptNextAction:
+    @pytest.mark.parametrize("action", ["again", "reconfigure", "quit"])
+    def test_returns_choice_value(self, prompts, action):
+        prompts["select"].answers = [action]
+        assert interactive.prompt_next_action() == action
+        call = prompts["select"].calls[0]
+        assert call["default"] == "again"
+        assert [choice.value for choice in call["choices"]] == ["again", "reconfigure", "quit"]
+
+
+class TestSelectDevices:
+    def test_returns_selected_ports(self, prompts, monkeypatch):
+        monkeypatch.setattr(interactive.Ray, "find_board_ports", staticmethod(lambda: ["COM3", "COM4"]))
+        prompts["checkbox"].answers = [[], ["COM4"]]  # an empty selection asks again
+        assert interactive.select_devices() == ["COM4"]
+        assert len(prompts["checkbox"].calls) == 2
+
+    def test_exit(self, prompts, exits, monkeypatch):
+        monkeypatch.setattr(interactive.Ray, "find_board_ports", staticmethod(lambda: ["COM3"]))
+        prompts["checkbox"].answers = [["COM3", None]]
+        with pytest.raises(SystemExit):
+            interactive.select_devices()
+        assert exits == [True]
+
+
+class FakeResponse:
+    def __init__(self, payload=None, content=b""):
+        self.payload = payload
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class TestSelectSoftware:
+    ASSET = interactive.SYSTEM_UPDATE_ASSET.get(interactive.DEFAULT_SYSTEM, interactive.DEFAULT_UPDATE_ASSET)
+
+    def release(self, tag):
+        return {
+            "tag_name": tag,
+            "published_at": "2025-01-01T00:00:00Z",
+            "body": "",
+            "assets": [{"name": self.ASSET, "browser_download_url": f"https://example.invalid/{tag}"}],
+        }
+
+    @pytest.fixture
+    def downloads(self, monkeypatch):
+        import requests
+
+        releases = [self.release("v1.0.0"), self.release("v1.1.0")]
+        fetched = []
+
+        def fake_get(url, timeout):
+            fetched.append(url)
+            return FakeResponse(payload=releases) if url.endswith("/releases") else FakeResponse(content=b"update")
+
+        monkeypatch.setattr(requests, "get", fake_get)
+        monkeypatch.setattr(interactive, "validate_update_file", lambda path: True)
+        return fetched
+
+    def test_downloads_the_selected_release(self, prompts, downloads):
+        prompts["select"].answers = [self.release("v1.0.0")]
+        path = interactive.select_software()
+        try:
+            assert downloads[-1] == "https://example.invalid/v1.0.0"
+            with open(path, "rb") as f:
+                assert f.read() == b"update"
+        finally:
+            os.remove(path)
+        # Newest release first, Exit last.
+        values = [choice.value for choice in prompts["select"].calls[0]["choices"]]
+        assert [v["tag_name"] for v in values[:-1]] == ["v1.1.0", "v1.0.0"]
+        assert values[-1] is None
+
+    def test_exit(self, prompts, downloads, exits):
+        prompts["select"].answers = [None]
+        with pytest.raises(SystemExit):
+            interactive.select_software()
+        assert exits == [True]
+        assert len(downloads) == 1  # nothing downloaded after the release list
@@ -1,9 +1,23 @@
 import base64
+import gc
 import hashlib
+import io
+import sys
+import types
 
 import pytest
+import serial.tools.list_ports
 
-from src.ray import PICO_VID, Ray
+import src.ray as ray
+from src.ray import (
+    COMMAND_CHUNK_SIZE,
+    PICO_VID,
+    RAW_REPL_BANNER,
+    READY_MARKER,
+    RECEIVE_CHUNK_SIZE,
+    TRANSFER_SETUP_SCRIPT,
+    Ray,
+)
 
 
 def make_file(filename, contents=b"data", metadata=None):
@@ -23,10 +37,10 @@ class TestGenerateTransferScript:
         """
         files = [
             make_file("main.py"),
-            make_file("lib/util.py", b"x" * 20000),  # forces chunked w() calls
+            make_file("lib/util.py", b"x" * 20000),
             make_file("setup.py", metadata={"execute": True}),
         ]
-        blocks = list(Ray.generate_transfer_script(files, progress=False))
+        blocks = [line for line in Ray.generate_transfer_script(files, progress=False) if isinstance(line, str)]
         assert blocks
         compile("\n".join(blocks), "<transfer-script>", "exec")
         for block in blocks:
@@ -36,18 +50,91 @@ class TestGenerateTransferScript:
         contents = b"hello board"
         expected = hashlib.sha256(contents).hexdigest()
         blocks = list(Ray.generate_transfer_script([make_file("main.py", contents)], progress=False))
-        script = "\n".join(blocks)
+        script = "\n".join(line for line in blocks if isinstance(line, str))
         assert f"hash_check('/main.py', '{expected}')" in script
 
     def test_leading_slash_and_mkdir(self):
         blocks = list(Ray.generate_transfer_script([make_file("lib/deep/mod.py")], progress=False))
-        script = "\n".join(blocks)
-        assert "f = open('/lib/deep/mod.py', 'wb')" in script
+        script = "\n".join(line for line in blocks if isinstance(line, str))
+        assert "receive('/lib/deep/mod.py', 4)" in script
         assert "mdir('/lib/deep')" in script
 
+    def test_directories_made_once(self):
+        files = [make_file("lib/deep/a.py"), make_file("lib/deep/b.py"), make_file("lib/c.py"), make_file("web/d.py")]
+        lines = [line for line in Ray.generate_transfer_script(files, progress=False) if isinstance(line, str) and line.startswith("mdir(")]
+        assert lines == ["mdir('/lib/deep')", "mdir('/web')"]
+
+    def test_mdir_creates_parents(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "micropython", types.ModuleType("micropython"))
+        scope = {}
+        exec(TRANSFER_SETUP_SCRIPT, scope)
+        made = []
+        monkeypatch.setattr(scope["os"], "mkdir", made.append)
+        scope["mdir"]("/lib/deep")
+        assert made == ["/lib", "/lib/deep"]
+
+    def _receive(self, monkeypatch):
+        micropython = types.ModuleType("micropython")
+        micropython.kbd_intr = lambda ch: None
+        monkeypatch.setitem(sys.modules, "micropython", micropython)
+        scope = {}
+        exec(TRANSFER_SETUP_SCRIPT, scope)
+        return scope["receive"]
+
+    def test_receive_signals_ready_once_open(self, monkeypatch, capsys, tmp_path):
+        receive = self._receive(monkeypatch)
+        monkeypatch.setattr(sys, "stdin", types.SimpleNamespace(buffer=io.BytesIO(b"abc")))
+        receive(str(tmp_path / "a.bin"), 3)
+        assert READY_MARKER.decode() in capsys.readouterr().out
+        assert (tmp_path / "a.bin").read_bytes() == b"abc"
+
+    def test_receive_drains_stdin_when_write_fails(self, monkeypatch, capsys):
+        class FullFile:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                pass
+
+            def write(self, data):
+                raise OSError(28, "No space left on device")
+
+        receive = self._receive(monkeypatch)
+        receive.__globals__["open"] = lambda path, mode: FullFile()
+        size = RECEIVE_CHUNK_SIZE * 2 + 1
+        stdin = io.BytesIO(b"x" * size + b"next command")
+        monkeypatch.setattr(sys, "stdin", types.SimpleNamespace(buffer=stdin))
+        with pytest.raises(OSError):
+            receive("/full.bin", size)
+        assert stdin.read() == b"next command"  # the whole payload was consumed
+
+    def test_receive_failed_open_never_signals_ready(self, monkeypatch, capsys, tmp_path):
+        receive = self._receive(monkeypatch)
+        with pytest.raises(OSError):
+            receive(str(tmp_path), 3)  # a directory cannot be opened for writing
+        assert READY_MARKER.decode() not in capsys.readouterr().out
+
     def test_execute_flag(self):
-        blocks = list(Ray.generate_transfer_script([make_file("run_me.py", metadata={"execute": True})], progress=False))
-        assert "execute_file('/run_me.py')" in "\n".join(blocks)
+        blocks = Ray.generate_transfer_script([make_file("run_me.py", metadata={"execute": True})], progress=False)
+        assert "execute_file('/run_me.py')" in "\n".join(line for line in blocks if isinstance(line, str))
+
+    def test_raw_contents_follow_receive(self):
+        contents = bytes(range(256))  # includes Ctrl-C / Ctrl-D bytes
+        blocks = list(Ray.generate_transfer_script([make_file("data.bin", contents)], progress=False))
+        index = blocks.index("receive('/data.bin', 256)")
+        assert blocks[index + 1] == contents
+
+    def test_execute_file_runs_main_and_removes_script(self, monkeypatch, tmp_path):
+        # Run the preamble under CPython; only the board-only module needs a stand-in.
+        monkeypatch.setitem(sys.modules, "micropython", types.ModuleType("micropython"))
+        scope = {}
+        exec(TRANSFER_SETUP_SCRIPT, scope)
+        script = tmp_path / "run_me.py"
+        script.write_text("ran = []\ndef main():\n    ran.append(__name__)\n    open(__file__ + '.done', 'w').close()\n")
+        scope["execute_file"](str(script))
+        assert not script.exists()
+        assert (tmp_path / "run_me.py.done").exists()
+        assert "run_me" not in sys.modules
 
     def test_missing_filename_raises(self):
         with pytest.raises(ValueError):
@@ -57,7 +144,7 @@ class TestGenerateTransferScript:
 class TestGetFilesToUpdate:
     def _board_with_index(self, monkeypatch, index):
         board = Ray.__new__(Ray)  # no serial port needed
-        monkeypatch.setattr(board, "sha256_index", lambda: index, raising=False)
+        monkeypatch.setattr(board, "sha256_index", lambda sizes=None: index, raising=False)
         return board
 
     def test_new_file_is_required(self, monkeypatch):
@@ -75,6 +162,141 @@ class TestGetFilesToUpdate:
         board = self._board_with_index(monkeypatch, {"/main.py": "0" * 64})
         assert board.get_files_to_update([make_file("main.py", b"new contents")]) == ["/main.py"]
 
+    def test_board_only_hashes_files_of_the_expected_size(self, monkeypatch):
+        board = self._board_with_index(monkeypatch, {})
+        seen = {}
+        monkeypatch.setattr(board, "sha256_index", lambda sizes=None: seen.update(sizes) or {})
+        files = [make_file("a.py", b""), make_file("b.py", b"x"), make_file("c.py", b"xy"), make_file("d.py", b"xyz" * 100)]
+        board.get_files_to_update(files)
+        assert seen == {"/a.py": 0, "/b.py": 1, "/c.py": 2, "/d.py": 300}
+
+    def test_hash_is_cached_for_the_transfer_script(self, monkeypatch):
+        contents = b"cached"
+        digest = hashlib.sha256(contents).hexdigest()
+        file_info = make_file("main.py", contents)
+        board = self._board_with_index(monkeypatch, {})
+        board.get_files_to_update([file_info])
+        assert file_info["sha256"] == digest
+        script = [line for line in Ray.generate_transfer_script([file_info], progress=False) if isinstance(line, str)]
+        assert f"hash_check('/main.py', '{digest}')" in script
+
+    def test_leaves_warmed_files_unchanged(self, monkeypatch):
+        file_info = make_file("main.py", b"shared")
+        Ray.file_sha256(file_info)
+        before = dict(file_info)
+        assert self._board_with_index(monkeypatch, {}).get_files_to_update([file_info]) == ["/main.py"]
+        assert file_info == before
+
+    def test_contents_are_decoded_once(self, monkeypatch):
+        file_info = make_file("main.py", b"decoded once")
+        calls = []
+        real = ray.binascii.a2b_base64
+        monkeypatch.setattr(ray.binascii, "a2b_base64", lambda data: calls.append(data) or real(data))
+        self._board_with_index(monkeypatch, {}).get_files_to_update([file_info])
+        payloads = [line for line in Ray.generate_transfer_script([file_info], progress=False) if isinstance(line, bytes)]
+        assert payloads == [b"decoded once"]
+        assert len(calls) == 1
+
+
+class TestSha256Index:
+    def _run_index(self, monkeypatch, capsys, sizes):
+        # Run the board script under CPython against real temporary files.
+        board = Ray.__new__(Ray)
+
+        def run(script_lines, read_timeout=None):
+            exec("\n".join(script_lines), {})
+            return capsys.readouterr().out
+
+        monkeypatch.setattr(board, "send_command", run, raising=False)
+        return board.sha256_index(sizes)
+
+    def test_only_listed_files_of_matching_size_are_hashed(self, monkeypatch, capsys, tmp_path):
+        same, resized = tmp_path / "same.py", tmp_path / "resized.py"
+        same.write_bytes(b"x" * 5000)
+        resized.write_bytes(b"abc")
+        sizes = {str(same): 5000, str(resized): 4, str(tmp_path / "missing.py"): 1, str(tmp_path): 0}
+        index = self._run_index(monkeypatch, capsys, sizes)
+        assert index == {str(same): hashlib.sha256(b"x" * 5000).hexdigest()}
+
+    def test_quoted_path_survives(self, monkeypatch, capsys, tmp_path):
+        quoted = tmp_path / 'it\'s "here".py'
+        quoted.write_bytes(b"q")
+        index = self._run_index(monkeypatch, capsys, {str(quoted): 1})
+        assert index == {str(quoted): hashlib.sha256(b"q").hexdigest()}
+
+    def test_output_cut_short_is_an_error(self, monkeypatch):
+        board = Ray.__new__(Ray)
+        monkeypatch.setattr(board, "send_command", lambda script_lines, read_timeout=None: '["/a.py", "00"]\r\n', raising=False)
+        with pytest.raises(ValueError, match="incomplete"):
+            board.sha256_index()
+
+
+class TestWipeBoard:
+    def test_removes_everything_deepest_first(self, monkeypatch, tmp_path):
+        (tmp_path / "lib" / "deep").mkdir(parents=True)
+        (tmp_path / "lib" / "deep" / "a.py").write_text("a")
+        (tmp_path / "lib" / "b.py").write_text("b")
+        (tmp_path / "empty").mkdir()
+        (tmp_path / "main.py").write_text("m")
+        real = tmp_path.as_posix()
+
+        # MicroPython's os on top of tmp_path, which stands in for "/".
+        board_os = types.SimpleNamespace(
+            ilistdir=lambda path: [(e.name, 0x4000 if e.is_dir() else 0x8000, 0) for e in ray.os.scandir(real + path)],
+            remove=lambda path: ray.os.remove(real + path),
+            rmdir=lambda path: ray.os.rmdir(real + path),
+        )
+        board = Ray.__new__(Ray)
+        scripts = []
+        monkeypatch.setattr(board, "send_command", scripts.append, raising=False)
+        board.wipe_board()
+        assert scripts[0][0] == "import os"
+        exec("\n".join(scripts[0][1:]), {"os": board_os})
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestIdentify:
+    def _board_printing(self, monkeypatch, out):
+        board = Ray.__new__(Ray)
+        scripts = []
+        monkeypatch.setattr(board, "send_command", lambda script, read_timeout=None: scripts.append(script) or out, raising=False)
+        return board, scripts
+
+    def test_pico_2_w_in_one_round_trip(self, monkeypatch):
+        board, scripts = self._board_printing(monkeypatch, '<<<["Raspberry Pi Pico 2 W with RP2350", "wpc"]>>>\r\n')
+        assert board.identify() == {"processor": "rp2350", "board": "Pico 2 W", "system": "wpc"}
+        assert len(scripts) == 1
+
+    def test_pico_w_has_no_system(self, monkeypatch):
+        board, _ = self._board_printing(monkeypatch, '<<<["Raspberry Pi Pico W with RP2040", ""]>>>')
+        assert board.identify() == {"processor": "rp2040", "board": "Pico W", "system": None}
+
+    def test_unreadable_output(self, monkeypatch):
+        board, _ = self._board_printing(monkeypatch, "Traceback (most recent call last):")
+        assert board.identify() == {"processor": None, "board": None, "system": None}
+
+
+class TestWriteUpdateVerification:
+    def _board_reporting(self, monkeypatch, output):
+        board = Ray.__new__(Ray)
+        monkeypatch.setattr(board, "get_files_to_update", lambda files: [], raising=False)
+        monkeypatch.setattr(board, "send_command_stream", lambda scripts, read_timeout=None: list(scripts), raising=False)
+        monkeypatch.setattr(board, "_read_with_retry", lambda script, read_timeout=None: output, raising=False)
+        return board
+
+    def test_all_verified(self, monkeypatch):
+        self._board_reporting(monkeypatch, "[]\r\n").write_update_to_board([], progress=False)
+
+    def test_failed_paths_are_reported(self, monkeypatch):
+        board = self._board_reporting(monkeypatch, '["/it\'s.py", "/b.py"]\r\n')
+        with pytest.raises(ValueError, match="/it's.py, /b.py"):
+            board.write_update_to_board([], progress=False)
+
+    def test_garbled_output(self, monkeypatch):
+        board = self._board_reporting(monkeypatch, "Traceback [oops]")
+        with pytest.raises(ValueError, match="failed to return hash checks"):
+            board.write_update_to_board([], progress=False)
+
 
 class FakeSerial:
     """Minimal stand-in for serial.Serial: records writes, replays queued reads."""
@@ -197,6 +419,236 @@ class TestSendCommandResponse:
         assert board.send_command("print('weird')", read_timeout=1) == "weird"
 
 
+class PasteSerial(FakeSerial):
+    """A FakeSerial that speaks raw-paste mode: it answers ``\\x05A\\x01``
+    with ``R\\x01`` and a window size, grants another window (``\\x01``) each
+    time the host fills one, and acknowledges the end of the script (``\\x04``)
+    before replaying ``response``. ``abort_after`` makes it stop reading early
+    with a ``\\x04`` of its own, as the board does on a syntax error."""
+
+    def __init__(self, response=b"\x04\x04>", window=8, abort_after=None):
+        super().__init__(b"")
+        self.window = window
+        self.response = response
+        self.abort_after = abort_after
+        self.pasted = b""
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.pasting = False
+
+    def write(self, data):
+        super().write(data)
+        if data == b"\x05A\x01":
+            self.pasting = True
+            self._pending += b"R\x01" + self.window.to_bytes(2, "little")
+        elif self.pasting and data == b"\x04":
+            self.pasting = False
+            if self.abort_after is None:
+                self._pending += b"\x04"
+            self._pending += self.response
+        elif self.pasting:
+            self.pasted += data
+            self.in_flight += len(data)
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            if self.abort_after is not None and len(self.pasted) >= self.abort_after:
+                self._pending += b"\x04"
+            elif self.in_flight >= self.window:
+                self.in_flight -= self.window
+                self._pending += b"\x01"
+
+
+class TestRawPaste:
+    def _board_with_serial(self, ser):
+        board = Ray.__new__(Ray)
+        board.port = "FAKE"
+        board.ser = ser
+        board._raw_paste_window = ser.window
+        return board
+
+    def test_streams_script_within_window(self):
+        ser = PasteSerial(b"hello\x04\x04>", window=8)
+        board = self._board_with_serial(ser)
+        script = "print('hello')\n" * 10
+        assert board.send_command(script, read_timeout=1) == "hello"
+        assert ser.pasted == script.encode()
+        assert ser.max_in_flight <= ser.window
+        assert b"OK" not in ser.written
+
+    def test_wait_for_completion_drains_prompt(self):
+        ser = PasteSerial(window=16)
+        board = self._board_with_serial(ser)
+        board.send_command("x = 1", ignore_response=True, wait_for_completion=True, read_timeout=1)
+        assert ser.in_waiting == 0
+
+    def test_board_abort_ends_paste_and_returns_error(self):
+        ser = PasteSerial(b"\x04SyntaxError\x04>", window=4, abort_after=4)
+        board = self._board_with_serial(ser)
+        result = board.send_command("def broken(:\n" * 4, read_timeout=1)
+        assert "SyntaxError" in result
+        assert len(ser.pasted) == 4
+
+    def test_fire_and_forget_uses_classic_raw_repl(self):
+        ser = PasteSerial()
+        board = self._board_with_serial(ser)
+        board.send_command("import machine\nmachine.reset()", ignore_response=True)
+        assert b"\x05A\x01" not in ser.written
+
+    def test_probe_returns_window_size(self):
+        ser = PasteSerial(window=256)
+        board = self._board_with_serial(ser)
+        assert board._probe_raw_paste() == 256
+        assert ser.in_waiting == 0
+
+    def test_probe_unsupported(self):
+        board = self._board_with_serial(PasteSerial())
+        board.ser.write = lambda data: setattr(board.ser, "_pending", b"R\x00>")
+        assert board._probe_raw_paste() is None
+
+    def test_probe_old_firmware_times_out_to_classic(self):
+        board = self._board_with_serial(PasteSerial())
+        board.ser.write = lambda data: setattr(board.ser, "_pending", b"raw REPL; CTRL-B to exit\r\n>")
+        assert board._probe_raw_paste(timeout=0.1) is None
+
+
+class PipelineSerial(FakeSerial):
+    """A FakeSerial modelling a board that executes one classic raw REPL
+    command at a time: each command (ended by Ctrl-D) is queued, and the
+    oldest one finishes after two reads of ``in_waiting``."""
+
+    def __init__(self):
+        super().__init__(b"")
+        self.ticks = 0
+        self.running = 0
+        self.max_running = 0
+        self.commands = 0
+
+    def write(self, data):
+        super().write(data)
+        if data == b"\x04":
+            self.commands += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+    @property
+    def in_waiting(self):
+        if not self._pending and self.running:
+            self.ticks += 1
+            if self.ticks == 2:
+                self.ticks = 0
+                self.running -= 1
+                self._pending = b"OK\x04\x04>"
+        return len(self._pending)
+
+
+class ReceiverSerial(FakeSerial):
+    """A FakeSerial whose ``receive(...)`` commands print the ready marker and
+    wait for three bytes of data (or fail with ``failure`` as their stderr);
+    other commands finish straight away. Records whether the data was written
+    only after the marker had been read."""
+
+    def __init__(self, failure=None):
+        super().__init__(b"")
+        self.marker_read = False
+        self.payload_after_marker = None
+        self.commands = 0
+        self.failure = failure
+        self.script = b""
+
+    def read(self, n):
+        data = super().read(n)
+        self.marker_read = self.marker_read or READY_MARKER in data
+        return data
+
+    def write(self, data):
+        super().write(data)
+        if data == b"\x04":
+            self.commands += 1
+            if b"receive(" not in self.script:
+                self._pending += b"OK\x04\x04>"
+            elif self.failure is not None:
+                self._pending += b"OK\x04" + self.failure + b"\x04>"
+            else:
+                self._pending += b"OK" + READY_MARKER + b"\r\n"
+        elif data == b"\x03\x04\x00":
+            self.payload_after_marker = self.marker_read
+            self._pending += b"\x04\x04>"
+        else:
+            self.script = data
+
+
+class TestSendCommandStream:
+    def _board_with_serial(self, ser, window=None):
+        board = Ray.__new__(Ray)
+        board.port = "FAKE"
+        board.ser = ser
+        board._raw_paste_window = window
+        return board
+
+    def test_queues_next_command_while_previous_runs(self):
+        ser = PipelineSerial()
+        board = self._board_with_serial(ser)
+        board.send_command_stream([f"x = {i}" for i in range(5)], read_timeout=1)
+        assert ser.commands == 5
+        assert ser.max_running == 2  # one executing, one queued behind it
+        assert ser.running == 0 and ser.in_waiting == 0
+
+    def test_times_out_when_a_command_never_finishes(self):
+        board = self._board_with_serial(FakeSerial())
+        with pytest.raises(TimeoutError):
+            board.send_command_stream(["while True: pass"], read_timeout=0.2)
+
+    def test_raw_paste_stream(self):
+        ser = PasteSerial(window=8)
+        board = self._board_with_serial(ser, window=ser.window)
+        board.send_command_stream(["a = 1", "b = 2"], read_timeout=1)
+        assert ser.pasted == b"a = 1\nb = 2\n"
+        assert ser.in_waiting == 0
+
+    def test_payload_waits_for_ready_marker(self):
+        ser = ReceiverSerial()
+        board = self._board_with_serial(ser)
+        board.send_command_stream(["receive('/a', 3)", b"\x03\x04\x00", "x = 1"], read_timeout=1)
+        assert ser.payload_after_marker is True
+        assert ser.written.endswith(b"receive('/a', 3)\n\x04\x03\x04\x00x = 1\n\x04")
+        assert ser.in_waiting == 0
+
+    def test_failed_receive_raises_board_error(self):
+        ser = ReceiverSerial(failure=b"Traceback (most recent call last):\r\nOSError: [Errno 21] EISDIR\r\n")
+        board = self._board_with_serial(ser)
+        with pytest.raises(ValueError, match="EISDIR"):
+            board.send_command_stream(["x = 0", "receive('/a', 3)", b"\x03\x04\x00", "x = 1"], read_timeout=1)
+        assert b"\x03\x04\x00" not in ser.written
+
+    def test_failed_receive_raises_board_error_raw_paste(self):
+        ser = PasteSerial(b"\x04OSError: [Errno 30] EROFS\r\n\x04>", window=64)
+        board = self._board_with_serial(ser, window=ser.window)
+        with pytest.raises(ValueError, match="EROFS"):
+            board.send_command_stream(["receive('/a', 3)", b"\x03\x04\x00"], read_timeout=1)
+        assert b"\x03\x04\x00" not in ser.written
+
+    def test_data_ends_its_block(self):
+        blocks = list(Ray._script_blocks(["a = 1", "receive('/a', 1)", b"x", "b = 2"]))
+        assert blocks == ["a = 1\nreceive('/a', 1)", b"x", "b = 2"]
+
+    def test_script_blocks_stay_bounded(self):
+        lines = ["x" * 1000] * 12
+        blocks = list(Ray._script_blocks(lines))
+        assert len(blocks) == 3
+        assert all(len(block.replace("\n", "")) <= COMMAND_CHUNK_SIZE for block in blocks)
+        assert "\n".join(blocks) == "\n".join(lines)
+
+
+class TestReadUntil:
+    def test_marker_split_across_reads(self):
+        board = Ray.__new__(Ray)
+        board.port = "FAKE"
+        board.ser = ResponderSerial([b"abc\x04", b">", b"tail"])
+        board.ser._armed = True
+        buf = bytearray()
+        assert board._read_until(buf, b"\x04>", None, "x") == 5
+        assert buf == b"abc\x04>"
+
+
 class TestReadWithRetry:
     def _bare_board(self):
         board = Ray.__new__(Ray)
@@ -290,10 +742,50 @@ class TestReplReadiness:
         assert board.wait_until_ready(timeout=1.0) is False
 
 
+class TestOpen:
+    def test_enters_raw_repl_without_fixed_sleeps(self, monkeypatch):
+        class BoardSerial(FakeSerial):
+            def __init__(self, *args, **kwargs):
+                super().__init__(b"")
+
+            def write(self, data):
+                super().write(data)
+                if data == b"\x01":
+                    self._pending += RAW_REPL_BANNER
+                elif data == b"\x05A\x01":
+                    self._pending += b"R\x00>"
+
+        monkeypatch.setattr(ray.serial, "Serial", BoardSerial)
+        monkeypatch.setattr(ray.time, "sleep", lambda s: pytest.fail("open() slept"))
+        board = Ray.__new__(Ray)
+        board.port = "FAKE"
+        board.open()
+        assert board.ser.written == b"\x03\x03\x01\x05A\x01"
+        assert board._raw_paste_window is None
+
+
+class TestInstanceTracking:
+    def test_context_manager_closes_and_untracks(self):
+        ser = FakeSerial()
+        ser.close = lambda: setattr(ser, "is_open", False)
+        with Ray("FAKE") as board:
+            board.ser = ser
+            assert board in Ray._instances
+        assert not ser.is_open
+        assert board not in Ray._instances
+
+    def test_unreferenced_instance_is_not_kept_alive(self):
+        before = len(Ray._instances)
+        Ray("FAKE")
+        gc.collect()
+        assert len(Ray._instances) == before
+
+
 class FakePortInfo:
-    def __init__(self, vid=None, hwid=""):
+    def __init__(self, vid=None, hwid="", device=None):
         self.vid = vid
         self.hwid = hwid
+        self.device = device
 
 
 class TestPortIsBoard:
@@ -310,3 +802,41 @@ class TestPortIsBoard:
 
     def test_none_hwid(self):
         assert not Ray._port_is_board(FakePortInfo(vid=None, hwid=None))
+
+
+class TestFindBoardPortsSysfs:
+    def _add_tty(self, tmp_path, name, vid):
+        device = tmp_path / "devices" / name / "1-1"
+        interface = device / "1-1:1.0"
+        interface.mkdir(parents=True)
+        if vid is not None:
+            (device / "idVendor").write_text(f"{vid:04x}\n")
+        tty = tmp_path / "class" / "tty" / name
+        tty.mkdir(parents=True)
+        (tty / "device").symlink_to(interface)
+
+    def test_matches_pico_acm_ports_only(self, tmp_path):
+        self._add_tty(tmp_path, "ttyACM0", PICO_VID)
+        self._add_tty(tmp_path, "ttyACM1", 0x1234)
+        self._add_tty(tmp_path, "ttyACM2", None)  # vanished mid-scan
+        self._add_tty(tmp_path, "ttyUSB0", PICO_VID)
+        (tmp_path / "class" / "tty" / "tty0").mkdir()
+        assert Ray._find_board_ports_sysfs(str(tmp_path / "class" / "tty")) == ["/dev/ttyACM0"]
+
+
+class TestFindBoardPortsComports:
+    def test_scan_is_reused_briefly(self, monkeypatch):
+        scans = []
+        monkeypatch.setattr(ray.sys, "platform", "win32")
+        monkeypatch.setattr(Ray, "_ports_cache", None)
+        monkeypatch.setattr(Ray, "_ports_time", 0.0)
+        monkeypatch.setattr(serial.tools.list_ports, "comports", lambda: scans.append(1) or [FakePortInfo(vid=PICO_VID, device="COM3")])
+        clock = [100.0]
+        monkeypatch.setattr(ray.time, "monotonic", lambda: clock[0])
+        assert Ray.find_board_ports() == ["COM3"]
+        clock[0] += ray.PORT_SCAN_TTL / 2
+        assert Ray.find_board_ports() == ["COM3"]
+        assert len(scans) == 1
+        clock[0] += ray.PORT_SCAN_TTL
+        Ray.find_board_ports()
+        assert len(scans) == 2
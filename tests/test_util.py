@@ -1,24 +1,95 @@
+import errno
 import re
+import time
 
 import pytest
 
+import src.util as util
 from src.util import wait_for
 
 
 class TestWaitFor:
+    @pytest.fixture(autouse=True)
+    def recheck_every_tick(self, monkeypatch):
+        monkeypatch.setattr(util, "RECHECK_INTERVAL", 0)
+
     def test_returns_when_condition_met(self):
         calls = []
 
         def condition():
             calls.append(1)
-            return len(calls) >= 2
+            return len(calls) >= 2, "waiting"
 
         wait_for(condition, timeout=10)
         assert len(calls) == 2
 
+    def test_redraws_status_in_place(self, capsys):
+        def condition():
+            return True, "waiting"
+
+        wait_for(condition, timeout=10)
+        assert capsys.readouterr().out == "\rwaiting.    \n"
+
     def test_raises_timeout(self):
         with pytest.raises(TimeoutError):
-            wait_for(lambda: False, timeout=0.1)
+            wait_for(lambda: (False, "waiting"), timeout=0.1)
+
+
+class TestWaitForDeviceEvents:
+    @pytest.fixture(autouse=True)
+    def no_device_events(self, monkeypatch):
+        monkeypatch.setattr(util, "RECHECK_INTERVAL", 3600)
+        monkeypatch.setattr(util.DeviceWatch, "wait", lambda self, timeout: time.sleep(0.01))
+
+    def test_condition_not_rechecked_without_a_device_change(self):
+        calls = []
+
+        def condition():
+            calls.append(1)
+            return False, "waiting"
+
+        with pytest.raises(TimeoutError):
+            wait_for(condition, timeout=0.1)
+        assert len(calls) == 1
+
+    def test_redraw_repeats_only_the_last_status_line(self, capsys, monkeypatch):
+        ticks = iter([True, False, True])
+        monkeypatch.setattr(util.DeviceWatch, "wait", lambda self, timeout: next(ticks))
+        calls = []
+
+        def condition():
+            calls.append(1)
+            status = "one-off hint\nwaiting" if len(calls) == 1 else "waiting"
+            return len(calls) == 2, status
+
+        wait_for(condition, timeout=10)
+        out = capsys.readouterr().out
+        assert out.count("one-off hint") == 1
+        assert "\rwaiting..   " in out  # the redraw between the two checks
+        assert len(calls) == 2
+
+    def test_worker_output_is_not_captured(self, capsys):
+        # Output from other threads (e.g. boards flashing in a pool) must reach
+        # the real stdout while wait_for is checking its condition.
+        def condition():
+            print("from a worker")
+            return True, "waiting"
+
+        wait_for(condition, timeout=10)
+        assert capsys.readouterr().out.startswith("from a worker\n")
+
+
+class TestDeviceWatch:
+    def test_overflowed_uevent_socket_counts_as_a_change(self, monkeypatch):
+        class OverflowedSocket:
+            def recv(self, size):
+                raise OSError(errno.ENOBUFS, "No buffer space available")
+
+        watch = util.DeviceWatch.__new__(util.DeviceWatch)
+        watch._uevents = OverflowedSocket()
+        watch._mounts = object()
+        monkeypatch.setattr(util.select, "select", lambda r, w, x, timeout: (r, [], []))
+        assert watch.wait(0.5) is True
 
 
 class TestVersion: